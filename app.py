@@ -2,470 +2,193 @@
 # Imports
 # ----------------------------------------------------------------------------#
 
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, flash, redirect, url_for
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 import logging
 from logging import Formatter, FileHandler
-from forms import *
 
-# ----------------------------------------------------------------------------#
-# App Config.
-# ----------------------------------------------------------------------------#
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object("config")
-db = SQLAlchemy()
-migrate = Migrate()
+import click
+from flask import Flask, render_template
+from flask.cli import with_appcontext
+
+from extensions import (
+    assets,
+    async_reads,
+    autocomplete,
+    cache,
+    db,
+    instrumentation,
+    moment,
+    router,
+)
+from templating import configure_templates, warm_templates
+
 
 # ----------------------------------------------------------------------------#
-# Models.
+# App Config.
 # ----------------------------------------------------------------------------#
-with app.app_context():
+def create_app(config="config", **overrides):
+    """Build the application.
+
+    ``config`` is an object or import path for ``app.config.from_object``;
+    keyword arguments override single settings after it is loaded. Nothing
+    here connects to the database: engines are created on first use and the
+    schema is managed by Alembic (``flask db upgrade``), or by ``flask
+    init-db`` for a new, empty database.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config.update(overrides)
+    configure_engine(app)
+
+    moment.init_app(app)
+    assets.init_app(app)
+    cache.init_app(app)
+    instrumentation.init_app(app)
     db.init_app(app)
-    migrate.init_app(app, db)
-    db.create_all()
-
-from models import Venue, Artist, Show
+    router.init_app(app, db)
+    async_reads.init_app(app)
+    autocomplete.init_app(app, db)
+    if click.get_current_context(silent=True) is not None:
+        init_migrate(app)
+
+    register_blueprints(app)
+    register_filters(app)
+    register_commands(app)
+    register_error_handlers(app)
+    configure_logging(app)
+    configure_templates(app)
+    if app.config.get("TEMPLATE_WARMUP"):
+        warm_templates(app)
+    return app
+
+
+def configure_engine(app):
+    # The pool and timeout options depend on the database, which is only
+    # known once the overrides are in: an in-memory SQLite database is a
+    # single shared connection and rejects pool_size and friends.
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.pool import StaticPool
+
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    in_memory = url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+    if not in_memory and options.get("poolclass") is not StaticPool:
+        options.setdefault("pool_size", app.config.get("DB_POOL_SIZE", 5))
+        options.setdefault("max_overflow", app.config.get("DB_MAX_OVERFLOW", 10))
+        options.setdefault("pool_timeout", app.config.get("DB_POOL_TIMEOUT", 30))
+    timeout = app.config.get("DB_STATEMENT_TIMEOUT", 0)
+    if timeout and url.get_backend_name() == "postgresql":
+        options.setdefault("connect_args", {"options": f"-c statement_timeout={timeout}"})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def init_migrate(app):
+    # Alembic takes about as long to import as everything else here put
+    # together, and only ``flask db`` and ``flask init-db`` use it, so it is
+    # loaded when the flask command line builds the app and not in workers.
+    from flask_migrate import Migrate
+
+    Migrate(app, db)
+
+
+def register_blueprints(app):
+    # Imported here so that importing app.py stays cheap and does not load
+    # the models, forms and queries until an application is built.
+    from artists import bp as artists
+    from autocomplete import bp as autocomplete_names
+    from debug import debug
+    from export import export
+    from shows import bp as shows
+    from venues import bp as venues
+
+    app.add_url_rule("/", "index", index)
+    app.register_blueprint(venues)
+    app.register_blueprint(artists)
+    app.register_blueprint(shows)
+    app.register_blueprint(autocomplete_names)
+    app.register_blueprint(export)
+    app.register_blueprint(debug)
 
 
 # ----------------------------------------------------------------------------#
 # Filters.
 # ----------------------------------------------------------------------------#
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale="en")
-
+def register_filters(app):
+    from filters import format_datetime
 
-app.jinja_env.filters["datetime"] = format_datetime
+    app.jinja_env.filters["datetime"] = format_datetime
 
 
 # ----------------------------------------------------------------------------#
-# Controllers.
+# Commands.
 # ----------------------------------------------------------------------------#
-@app.route("/")
-def index():
-    return render_template("pages/home.html")
-
-
-#  Venues
-#  ----------------------------------------------------------------
-
-
-@app.route("/venues")
-def venues():
-    # TODO: replace with real venues data.
-    #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
-    venues = Venue.query.all()
-    data = {}
-    for venue in venues:
-        if venue.city not in data:
-            data[venue.city] = {"city": venue.city, "state": venue.state, "venues": []}
-        data[venue.city]["venues"].append(
-            {
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": len(
-                    [show for show in venue.shows if show.start_time > datetime.now()]
-                ),
-            }
-        )
-    data = list(data.values())
-    return render_template("pages/venues.html", areas=data)
-
-
-@app.route("/venues/search", methods=["POST"])
-def search_venues():
-    search_term = request.form.get("search_term", "")
-    venues = Venue.query.filter(Venue.name.ilike(f"%{search_term}%")).all()
-    data = []
-    for venue in venues:
-        data.append(
-            {
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": len(
-                    [show for show in venue.shows if show.start_time > datetime.now()]
-                ),
-            }
-        )
-    response = {"count": len(venues), "data": data}
-    return render_template(
-        "pages/search_venues.html",
-        results=response,
-        search_term=request.form.get("search_term", ""),
-    )
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Create the current schema in an empty database and stamp it at head.
 
+    The migration history starts from a schema that predates it, so a new
+    database is built from the models instead of by replaying every
+    revision. Existing databases are upgraded with ``flask db upgrade``.
+    """
+    from flask_migrate import stamp
 
-@app.route("/venues/<int:venue_id>")
-def show_venue(venue_id):
-    venue = Venue.query.get_or_404(venue_id)
-    upcoming_shows = []
-    past_shows = []
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for show in venue.shows:
-        show.start_time = show.start_time.strftime("%Y-%m-%d %H:%M:%S")
-        show_item = {
-            "artist_id": show.artist_id,
-            "artist_name": show.Artist.name,
-            "artist_image_link": show.Artist.image_link,
-            "start_time": show.start_time,
-        }
-        if show.start_time > now:
-            upcoming_shows.append(show_item)
-        else:
-            past_shows.append(show_item)
-    data = {
-        "id": venue.id,
-        "name": venue.name,
-        "city": venue.city,
-        "state": venue.state,
-        "phone": venue.phone,
-        "website_link": venue.website_link,
-        "address": venue.address,
-        "facebook_link": venue.facebook_link,
-        "seeking_talent": venue.seeking_talent,
-        "seeking_description": venue.seeking_description,
-        "website_link": venue.website_link,
-        "image_link": venue.image_link,
-        "genres": venue.genres,
-        "upcoming_shows_count": len(upcoming_shows),
-        "upcoming_shows": upcoming_shows,
-        "past_shows_count": len(past_shows),
-        "past_shows": past_shows,
-    }
-    return render_template("pages/show_venue.html", venue=data)
-
-
-#  Create Venue
-#  ----------------------------------------------------------------
-
-
-@app.route("/venues/create", methods=["GET"])
-def create_venue_form():
-    form = VenueForm()
-    return render_template("forms/new_venue.html", form=form)
-
-
-@app.route("/venues/create", methods=["POST"])
-def create_venue_submission():
-    # TODO: insert form data as a new Venue record in the db, instead
-    form = VenueForm(request.form)
-    if form.validate():
-        try:
-            venue = Venue(
-                name=form.name.data,
-                city=form.city.data,
-                state=form.state.data,
-                address=form.address.data,
-                phone=form.phone.data,
-                image_link=form.image_link.data,
-                genres=form.genres.data,
-                facebook_link=form.facebook_link.data,
-                website_link=form.website_link.data,
-                seeking_talent=form.seeking_talent.data,
-                seeking_description=form.seeking_description.data,
-            )
-            db.session.add(venue)
-            db.session.commit()
-            # on successful db insert, flash success
-            flash("Venue " + request.form["name"] + " was successfully listed!")
-        except:
-            db.session.rollback()
-            flash("An error occurred. Venue " + request.form["name"] + " could not be listed.")
-        finally:
-            db.session.close()
-    else:
-        for field, errors in form.errors.items():
-            for error in errors:
-                flash(field + " - " + str(error), "danger")
-    return render_template("pages/home.html")
-
+    import models  # noqa: F401  registers the tables on db.metadata
 
-@app.route("/venues/<venue_id>", methods=["DELETE"])
-def delete_venue(venue_id):
-    # TODO: Complete this endpoint for taking a venue_id, and using
-    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-
-    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
-    # clicking that button delete it from the db then redirect the user to the homepage
-    venue = Venue.query.get_or_404(venue_id)
-    del_venue = venue.name
-    try:
-        db.session.delete(venue)
-        db.session.commit()
-        flash("Venue" + del_venue + " was deleted!")
-    except Exception as e:
-        db.session.rollback()
-        flash("An error occurred. Venue " + del_venue + "could not be deleted!")
-    return render_template("pages/home.html")
-
-
-#  Artists
-#  ----------------------------------------------------------------
-@app.route("/artists")
-def artists():
-    # TODO: replace with real data returned from querying the database
-    artists = db.session.query(Artist.id, Artist.name).all()
-    return render_template("pages/artists.html", artists=artists)
-
-
-@app.route("/artists/search", methods=["POST"])
-def search_artists():
-    search_term = request.form.get("search_term", "")
-    artists = Artist.query.filter(Artist.name.ilike(f"%{search_term}%")).all()
-    data = []
-    for artist in artists:
-        data.append(
-            {
-                "id": artist.id,
-                "name": artist.name,
-                "num_upcoming_shows": len(
-                    [show for show in artist.shows if show.start_time > datetime.now()]
-                ),
-            }
-        )
-    response = {"count": len(artists), "data": data}
-    return render_template(
-        "pages/search_artists.html",
-        results=response,
-        search_term=request.form.get("search_term", ""),
-    )
+    db.create_all()
+    stamp()
+    click.echo("Created the schema and stamped it at the latest revision.")
 
 
-@app.route("/artists/<int:artist_id>")
-def show_artist(artist_id):
-    # shows the artist page with the given artist_id
-    # TODO: replace with real artist data from the artist table, using artist_id
-    artist = Artist.query.get_or_404(artist_id)
-    upcoming_shows = []
-    past_shows = []
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for show in artist.shows:
-        show.start_time = show.start_time.strftime("%Y-%m-%d %H:%M:%S")
-        show_item = {
-            "venue_id": show.venue_id,
-            "venue_name": show.Venue.name,
-            "venue_image_link": show.Venue.image_link,
-            "start_time": show.start_time,
-        }
-        if show.start_time > now:
-            upcoming_shows.append(show_item)
-        else:
-            past_shows.append(show_item)
-    data = {
-        "id": artist.id,
-        "name": artist.name,
-        "city": artist.city,
-        "state": artist.state,
-        "phone": artist.phone,
-        "facebook_link": artist.facebook_link,
-        "genres": artist.genres,
-        "image_link": artist.image_link,
-        "website_link": artist.website_link,
-        "seeking_venue": artist.seeking_venue,
-        "seeking_description": artist.seeking_description,
-        "upcoming_shows": upcoming_shows,
-        "past_shows": past_shows,
-        "upcoming_shows_count": len(upcoming_shows),
-        "past_shows_count": len(past_shows),
-    }
-    return render_template("pages/show_artist.html", artist=data)
-
-
-#  Update
-#  ----------------------------------------------------------------
-@app.route("/artists/<int:artist_id>/edit", methods=["GET"])
-def edit_artist(artist_id):
-    artist = Artist.query.get_or_404(artist_id)
-    form = ArtistForm(obj=artist)
-    return render_template("forms/edit_artist.html", form=form, artist=artist)
-
-
-@app.route("/artists/<int:artist_id>/edit", methods=["POST"])
-def edit_artist_submission(artist_id):
-    # TODO: take values from the form submitted, and update existing
-    # artist record with ID <artist_id> using the new attributes
-    artist = Artist.query.get_or_404(artist_id)
-    for field in request.form:
-        if field == "genres":
-            setattr(artist, field, request.form.getlist(field))
-        elif field == "seeking_venue":
-            setattr(artist, field, request.form.get(field) == "y")
-        else:
-            setattr(artist, field, request.form.get(field))
-    try:
-        db.session.add(artist)
-        db.session.commit()
-        flash("Artist " + request.form["name"] + " was successfully updated!")
-    except Exception as e:
-        db.session.rollback()
-        flash("An error occurred. Artist " + request.form["name"] + " could not be updated.")
-    return redirect(url_for("show_artist", artist_id=artist_id))
-
-
-@app.route("/venues/<int:venue_id>/edit", methods=["GET"])
-def edit_venue(venue_id):
-    venue = Venue.query.get_or_404(venue_id)
-    form = VenueForm(obj=venue)
-    return render_template("forms/edit_venue.html", form=form, venue=venue)
-
-
-@app.route("/venues/<int:venue_id>/edit", methods=["POST"])
-def edit_venue_submission(venue_id):
-    venue = Venue.query.get_or_404(venue_id)
-    form = VenueForm(obj=venue)
-    if form.validate():
-        for field in request.form:
-            if field == "genres":
-                setattr(venue, field, request.form.getlist(field))
-            elif field == "seeking_talent":
-                setattr(venue, field, request.form.get(field) == "y")
-            else:
-                setattr(venue, field, request.form.get(field))
-        try:
-            db.session.add(venue)
-            db.session.commit()
-            flash("Venue " + request.form["name"] + " was successfully updated!")
-        except Exception as e:
-            db.session.rollback()
-            flash("An error occurred. Venue " + request.form["name"] + " could not be updated.")
-    else:
-        for field, errors in form.errors.items():
-            for error in errors:
-                flash(field + " - " + str(error), "danger")
-
-    return redirect(url_for("show_venue", venue_id=venue_id))
-
-
-#  Create Artist
-#  ----------------------------------------------------------------
-
-
-@app.route("/artists/create", methods=["GET"])
-def create_artist_form():
-    form = ArtistForm()
-    return render_template("forms/new_artist.html", form=form)
-
-
-@app.route("/artists/create", methods=["POST"])
-def create_artist_submission():
-    # called upon submitting the new artist listing form
-    # TODO: insert form data as a new Venue record in the db, instead
-    # TODO: modify data to be the data object returned from db insertion
-    name = request.form.get("name")
-    city = request.form.get("city")
-    state = request.form.get("state")
-    phone = request.form.get("phone")
-    genres = request.form.getlist("genres")
-    facebook_link = request.form.get("facebook_link")
-    image_link = request.form.get("image_link")
-    website_link = request.form.get("website_link")
-    seeking_venue = request.form.get("seeking_venue")
-    seeking_description = request.form.get("seeking_description")
-
-    artist = Artist(
-        name=name,
-        city=city,
-        state=state,
-        phone=phone,
-        genres=genres,
-        facebook_link=facebook_link,
-        image_link=image_link,
-        website_link=website_link,
-        seeking_venue=seeking_venue == "y",
-        seeking_description=seeking_description,
-    )
+def register_commands(app):
+    # Importing counters and versions also installs the mapper events that
+    # keep the show counters and table versions current, which every
+    # application needs.
+    from assets import assets_cli
+    from counters import counters_cli
+    from importer import import_cli
+    from templating import templates_cli
+    import versions  # noqa: F401
 
-    db.session.add(artist)
-    try:
-        db.session.commit()
-        flash("Artist " + request.form["name"] + " was successfully listed!")
-    except Exception as e:
-        db.session.rollback()
-        flash("An error occurred. Artist " + request.form["name"] + " could not be listed.")
-    return render_template("pages/home.html")
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(templates_cli)
 
 
-#  Shows
-#  ----------------------------------------------------------------
-
-
-@app.route("/shows")
-def shows():
-    # displays list of shows at /shows
-    # TODO: replace with real venues data.
-    shows = Show.query.all()
-    data = []
-    for show in shows:
-        data.append(
-            {
-                "venue_id": show.venue_id,
-                "venue_name": show.Venue.name,
-                "artist_id": show.artist_id,
-                "artist_name": show.Artist.name,
-                "artist_image_link": show.Artist.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            }
-        )
-    return render_template("pages/shows.html", shows=data)
-
-
-@app.route("/shows/create")
-def create_shows():
-    # renders form. do not touch.
-    form = ShowForm()
-    return render_template("forms/new_show.html", form=form)
-
-
-@app.route("/shows/create", methods=["POST"])
-def create_show_submission():
-    # called to create new shows in the db, upon submitting new show listing form
-    # TODO: insert form data as a new Show record in the db, instead
-    artist_id = request.form.get("artist_id")
-    venue_id = request.form.get("venue_id")
-    start_time = request.form.get("start_time")
-    show = Show(
-        artist_id=artist_id,
-        venue_id=venue_id,
-        start_time=start_time,
-    )
-    db.session.add(show)
-    try:
-        db.session.commit()
-        flash("Show was successfully listed!")
-    except Exception as e:
-        db.session.rollback()
-        flash("An error occurred. Show could not be listed.")
+# ----------------------------------------------------------------------------#
+# Controllers.
+# ----------------------------------------------------------------------------#
+def index():
     return render_template("pages/home.html")
 
 
-@app.errorhandler(404)
 def not_found_error(error):
     return render_template("errors/404.html"), 404
 
 
-@app.errorhandler(500)
 def server_error(error):
     return render_template("errors/500.html"), 500
 
 
-if not app.debug:
-    file_handler = FileHandler("error.log")
-    file_handler.setFormatter(
-        Formatter("%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]")
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info("errors")
+def register_error_handlers(app):
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, server_error)
+
+
+def configure_logging(app):
+    if not app.debug:
+        file_handler = FileHandler("error.log")
+        file_handler.setFormatter(
+            Formatter("%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]")
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info("errors")
+
 
 # ----------------------------------------------------------------------------#
 # Launch.
@@ -473,11 +196,11 @@ if not app.debug:
 
 # Default port:
 if __name__ == "__main__":
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 """
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 """
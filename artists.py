@@ -0,0 +1,216 @@
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_template,
+    url_for,
+)
+from sqlalchemy.orm.exc import StaleDataError
+
+from conditional import conditional
+from editing import load_for_edit, save_edit
+from extensions import async_reads, autocomplete, cache, db
+from forms import ArtistForm, EditArtistForm, calendar_range, list_filters
+from invalidation import invalidate_artist, invalidate_artist_lists, show_venue_ids
+from models import Artist, Show
+from queries import (
+    calendar,
+    artist_list,
+    artist_shows,
+    artist_shows_query,
+    artist_version,
+    artists_version,
+    facet_counts,
+    show_timeline,
+)
+from routing import read_only
+from search import search
+
+bp = Blueprint("artists", __name__)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+@bp.route("/artists")
+@read_only
+@conditional(artists_version)
+@cache.cached(lambda: "artists:{}:{}".format(*list_filters(request.args)))
+def artists():
+    genre, state = list_filters(request.args)
+    facets = cache.get_or_set(
+        f"facets:artists:{genre or ''}:{state or ''}",
+        lambda: facet_counts(Artist, genre, state),
+    )
+    stream = current_app.config["STREAM_LIST_PAGES"]
+    render = stream_template if stream else render_template
+    return render(
+        "pages/artists.html",
+        artists=artist_list(genre, state, stream=stream),
+        facets=facets,
+        genre=genre,
+        state=state,
+    )
+
+
+@bp.route("/artists/search", methods=["POST"])
+@read_only
+def search_artists():
+    search_term = request.form.get("search_term", "")
+    page = max(1, request.form.get("page", 1, type=int))
+    response = search(Artist, search_term, page, current_app.config["SEARCH_PAGE_SIZE"])
+    return render_template(
+        "pages/search_artists.html",
+        results=response,
+        search_term=search_term,
+    )
+
+
+@bp.route("/artists/<int:artist_id>")
+@read_only
+@conditional(artist_version)
+@cache.cached(lambda artist_id: f"artist:{artist_id}")
+def show_artist(artist_id):
+    limit = current_app.config["DETAIL_SHOWS_LIMIT"]
+    if async_reads.enabled:
+        rows, shows = async_reads.gather(
+            db.select(Artist.__table__).where(Artist.id == artist_id),
+            artist_shows_query(artist_id, limit),
+        )
+        if not rows:
+            abort(404)
+        artist, shows = rows[0], show_timeline(shows)
+    else:
+        artist = Artist.query.get_or_404(artist_id)
+        shows = artist_shows(artist_id, limit=limit)
+    data = {
+        "id": artist.id,
+        "name": artist.name,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "facebook_link": artist.facebook_link,
+        "genres": artist.genres,
+        "image_link": artist.image_link,
+        "website_link": artist.website_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        **shows,
+    }
+    return render_template("pages/show_artist.html", artist=data)
+
+
+@bp.route("/artists/<int:artist_id>/calendar")
+@read_only
+def artist_calendar(artist_id):
+    db.get_or_404(Artist, artist_id)
+    start, end = calendar_range(
+        request.args,
+        current_app.config["CALENDAR_DEFAULT_DAYS"],
+        current_app.config["CALENDAR_MAX_DAYS"],
+    )
+    shows = calendar(Show.artist_id, artist_id, start, end)
+    for show in shows:
+        show["start_time"] = show["start_time"].isoformat()
+        show["end_time"] = show["end_time"].isoformat()
+    return jsonify(artist_id=artist_id, start=start.isoformat(), end=end.isoformat(), shows=shows)
+
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route("/artists/<int:artist_id>/edit", methods=["GET"])
+def edit_artist(artist_id):
+    form = EditArtistForm()
+    artist = load_for_edit(Artist, artist_id, form)
+    form.process(obj=artist)
+    return render_template("forms/edit_artist.html", form=form, artist=artist)
+
+
+@bp.route("/artists/<int:artist_id>/edit", methods=["POST"])
+def edit_artist_submission(artist_id):
+    form = EditArtistForm()
+    if not form.validate():
+        for field, errors in form.errors.items():
+            for error in errors:
+                flash(field + " - " + str(error), "danger")
+        return redirect(url_for("artists.show_artist", artist_id=artist_id))
+
+    artist = load_for_edit(Artist, artist_id, form)
+    try:
+        changed = save_edit(artist, form)
+    except StaleDataError:
+        db.session.rollback()
+        flash(
+            "Artist " + form.name.data + " was changed by someone else while you were editing it."
+            " Your changes were not saved; the form now shows the current details.",
+            "danger",
+        )
+        return redirect(url_for("artists.edit_artist", artist_id=artist_id))
+    except Exception as e:
+        db.session.rollback()
+        flash("An error occurred. Artist " + form.name.data + " could not be updated.")
+        return redirect(url_for("artists.show_artist", artist_id=artist_id))
+
+    if changed:
+        invalidate_artist(artist_id, show_venue_ids(artist_id))
+        if "name" in changed:
+            autocomplete.put("artist", artist_id, form.name.data)
+        flash("Artist " + form.name.data + " was successfully updated!")
+    else:
+        flash("Artist " + form.name.data + " was not changed.")
+    return redirect(url_for("artists.show_artist", artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route("/artists/create", methods=["GET"])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template("forms/new_artist.html", form=form)
+
+
+@bp.route("/artists/create", methods=["POST"])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    # TODO: insert form data as a new Venue record in the db, instead
+    # TODO: modify data to be the data object returned from db insertion
+    name = request.form.get("name")
+    city = request.form.get("city")
+    state = request.form.get("state")
+    phone = request.form.get("phone")
+    genres = request.form.getlist("genres")
+    facebook_link = request.form.get("facebook_link")
+    image_link = request.form.get("image_link")
+    website_link = request.form.get("website_link")
+    seeking_venue = request.form.get("seeking_venue")
+    seeking_description = request.form.get("seeking_description")
+
+    artist = Artist(
+        name=name,
+        city=city,
+        state=state,
+        phone=phone,
+        genres=genres,
+        facebook_link=facebook_link,
+        image_link=image_link,
+        website_link=website_link,
+        seeking_venue=seeking_venue == "y",
+        seeking_description=seeking_description,
+    )
+
+    db.session.add(artist)
+    try:
+        db.session.commit()
+        invalidate_artist_lists()
+        autocomplete.put("artist", artist.id, artist.name)
+        flash("Artist " + request.form["name"] + " was successfully listed!")
+    except Exception as e:
+        db.session.rollback()
+        flash("An error occurred. Artist " + request.form["name"] + " could not be listed.")
+    return render_template("pages/home.html")
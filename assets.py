@@ -0,0 +1,229 @@
+"""Fingerprinted, precompressed static files.
+
+``flask assets build`` copies every file under static/ to static/dist/ with
+a content hash in its name, writes gzip and Brotli variants of the
+compressible ones, builds the CSS bundles, and records it all in
+static/dist/manifest.json. With a manifest present, ``url_for('static',
+filename=...)`` points at the hashed copy, and the static view serves it
+in the best encoding the client accepts with a far-future, immutable
+Cache-Control; a changed file gets a new name, so nothing is revalidated.
+Without one (development), URLs and caching stay as Flask has them and
+bundles are concatenated on request.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+import click
+from flask import Response, current_app, request, send_from_directory
+from flask.cli import AppGroup, with_appcontext
+
+assets_cli = AppGroup("assets", help="Build the fingerprinted static files.")
+
+# Bundles served as one file, in the order their parts are concatenated.
+BUNDLES = {
+    "css/bundle.css": (
+        "css/bootstrap.min.css",
+        "css/layout.main.css",
+        "css/main.css",
+        "css/main.responsive.css",
+        "css/main.quickfix.css",
+    ),
+}
+DIST = "dist"
+MANIFEST = "manifest.json"
+# Formats that are not compressed already; the rest are copied as they are.
+COMPRESSIBLE = {".css", ".js", ".map", ".json", ".svg", ".txt", ".eot", ".ttf", ".otf"}
+# Preferred first.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+CSS_TOKEN = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*!.*?\*/)|\s*([{};,>])\s*|(:)\s+|(?:\s*/\*.*?\*/)+\s*|\s+""",
+    re.S,
+)
+
+
+# ----------------------------------------------------------------------------#
+# Building.
+# ----------------------------------------------------------------------------#
+def minify_css(css):
+    """Drop comments (but /*! licences) and the whitespace CSS does not need."""
+
+    def token(match):
+        string, licence, punctuation, colon = match.groups()
+        return string or licence or punctuation or colon or " "
+
+    return CSS_TOKEN.sub(token, css).replace(";}", "}").strip()
+
+
+def rewrite_css_urls(css, path, url_for_path):
+    """Point the relative url()s of static/``path`` at ``url_for_path(target)``."""
+
+    def rewrite(match):
+        quote, url = match.groups()
+        if re.match(r"[a-z]+:|/|#", url):
+            return match.group(0)
+        target, suffix = re.match(r"([^?#]*)(.*)", url).groups()
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+        return f"url({quote}{url_for_path(target)}{suffix}{quote})"
+
+    return CSS_URL.sub(rewrite, css)
+
+
+def bundle_css(name, url_for_path):
+    static = current_app.static_folder
+    parts = []
+    for path in BUNDLES[name]:
+        with open(os.path.join(static, path), encoding="utf-8") as file:
+            parts.append(rewrite_css_urls(file.read(), path, url_for_path))
+    return minify_css("\n".join(parts))
+
+
+def _hashed(path, content):
+    stem, extension = posixpath.splitext(path)
+    return f"{DIST}/{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+
+
+def _write(static, path, content):
+    os.makedirs(os.path.dirname(os.path.join(static, path)), exist_ok=True)
+    with open(os.path.join(static, path), "wb") as file:
+        file.write(content)
+
+
+def _compress(static, path, content, brotli):
+    encodings = []
+    compressors = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda data: brotli.compress(data, quality=11)
+    for encoding, suffix in ENCODINGS:
+        if encoding in compressors:
+            compressed = compressors[encoding](content)
+            if len(compressed) < len(content):
+                _write(static, path + suffix, compressed)
+                encodings.append(encoding)
+    return encodings
+
+
+def build():
+    """Rebuild static/dist; returns the manifest and the size of each file."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        click.echo("Brotli is not installed; writing gzip variants only.", err=True)
+
+    static = current_app.static_folder
+    shutil.rmtree(os.path.join(static, DIST), ignore_errors=True)
+    paths = sorted(
+        os.path.relpath(os.path.join(directory, name), static).replace(os.sep, "/")
+        for directory, _, names in os.walk(static)
+        for name in names
+    )
+    assets, encoded, sizes = {}, {}, {}
+
+    def url_for_path(path):
+        return f"{current_app.static_url_path}/{assets.get(path, path)}"
+
+    def add(path, content):
+        assets[path] = hashed = _hashed(path, content)
+        _write(static, hashed, content)
+        sizes[hashed] = {"identity": len(content)}
+        encoded[hashed] = []
+        if posixpath.splitext(path)[1] in COMPRESSIBLE:
+            encoded[hashed] = _compress(static, hashed, content, brotli)
+        for encoding, suffix in ENCODINGS:
+            if encoding in encoded[hashed]:
+                sizes[hashed][encoding] = os.path.getsize(os.path.join(static, hashed + suffix))
+
+    # Stylesheets last, so the files they refer to already have their names.
+    for path in sorted(paths, key=lambda path: path.endswith(".css")):
+        with open(os.path.join(static, path), "rb") as file:
+            content = file.read()
+        if path.endswith(".css"):
+            content = rewrite_css_urls(content.decode("utf-8"), path, url_for_path).encode("utf-8")
+        add(path, content)
+    for name in BUNDLES:
+        add(name, bundle_css(name, url_for_path).encode("utf-8"))
+
+    manifest = {"assets": assets, "encoded": encoded}
+    with open(os.path.join(static, DIST, MANIFEST), "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest, sizes
+
+
+@assets_cli.command("build")
+@with_appcontext
+def build_command():
+    """Fingerprint, compress and bundle static/ into static/dist."""
+    manifest, sizes = build()
+    current_app.extensions["assets"].load_manifest(current_app)
+    for name in BUNDLES:
+        hashed = manifest["assets"][name]
+        click.echo(f"{name} -> {hashed}")
+        variants = (f"{encoding} {size:,}B" for encoding, size in sizes[hashed].items())
+        click.echo("  " + ", ".join(variants))
+    click.echo(f"Wrote {len(manifest['assets'])} files and their variants to static/{DIST}.")
+
+
+# ----------------------------------------------------------------------------#
+# Extension.
+# ----------------------------------------------------------------------------#
+class Assets:
+    """Serves the output of ``flask assets build``; see the module docstring."""
+
+    def __init__(self, app=None):
+        self.assets = {}
+        self.encoded = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("ASSETS_MAX_AGE", 365 * 24 * 3600)
+        app.extensions["assets"] = self
+        self.load_manifest(app)
+        app.url_defaults(self._fingerprint)
+        app.view_functions["static"] = self.send_static
+
+    def load_manifest(self, app):
+        try:
+            with open(os.path.join(app.static_folder, DIST, MANIFEST)) as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            manifest = {"assets": {}, "encoded": {}}
+        self.assets, self.encoded = manifest["assets"], manifest["encoded"]
+
+    def _fingerprint(self, endpoint, values):
+        if endpoint == "static" and "filename" in values:
+            values["filename"] = self.assets.get(values["filename"], values["filename"])
+
+    def send_static(self, filename):
+        if filename in BUNDLES:
+            static_url_path = current_app.static_url_path
+            css = bundle_css(filename, lambda path: f"{static_url_path}/{path}")
+            return Response(css, mimetype="text/css")
+        encodings = self.encoded.get(filename)
+        if encodings is None:
+            return current_app.send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        for encoding, suffix in ENCODINGS:
+            if encoding in encodings and request.accept_encodings[encoding]:
+                response = send_from_directory(
+                    current_app.static_folder, filename + suffix, mimetype=mimetype
+                )
+                response.content_encoding = encoding
+                break
+        else:
+            response = send_from_directory(current_app.static_folder, filename, mimetype=mimetype)
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config["ASSETS_MAX_AGE"]
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+        return response
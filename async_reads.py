@@ -0,0 +1,119 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+
+from flask import current_app, g
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Async driver for each database backend.
+ASYNC_DRIVERS = {"postgresql": "psycopg", "sqlite": "aiosqlite"}
+
+
+class AsyncReads:
+    """Runs the independent queries of a read-only page concurrently.
+
+    With ASYNC_READS on, ``gather(*statements)`` sends each statement over
+    its own connection from an async engine (psycopg 3 on Postgres, aiosqlite
+    on SQLite) and returns their rows once all have finished, so a page
+    waits for its slowest query instead of the sum of them. Reads honour the
+    replica routing of the request.
+
+    The engines live on one event loop per worker process, run by a daemon
+    thread started on first use (and again in a forked child). Flask's own
+    async views would run every request on a new event loop, and an async
+    connection pool cannot be shared between loops.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._engines = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("ASYNC_READS", False)
+        app.config.setdefault("ASYNC_READS_TIMEOUT", 30)
+        app.extensions["async_reads"] = self
+
+    @property
+    def enabled(self):
+        return current_app.config["ASYNC_READS"]
+
+    def gather(self, *statements):
+        """Execute ``statements`` concurrently; a list of row lists, in order."""
+        engine = self._engine(self._url())
+        loop = self._event_loop()
+        result = concurrent.futures.Future()
+        tasks = []
+
+        def start():
+            task = loop.create_task(self._gather(engine, statements))
+            task.add_done_callback(lambda task: _copy_outcome(task, result))
+            tasks.append(task)
+
+        # The tasks run in a copy of this request's context, so the SQL they
+        # send shows up in its timings like any other query.
+        loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+        try:
+            return result.result(current_app.config["ASYNC_READS_TIMEOUT"])
+        except concurrent.futures.TimeoutError:
+            loop.call_soon_threadsafe(lambda: tasks and tasks[0].cancel())
+            raise
+
+    async def _gather(self, engine, statements):
+        async def fetch(statement):
+            async with engine.connect() as connection:
+                return (await connection.execute(statement)).all()
+
+        return await asyncio.gather(*(fetch(statement) for statement in statements))
+
+    def _url(self):
+        if g.get("db_use_replica"):
+            router = current_app.extensions["replica_router"]
+            if router.replica_engine() is not None:
+                return current_app.config["SQLALCHEMY_BINDS"]["replica"]
+        return current_app.config["SQLALCHEMY_DATABASE_URI"]
+
+    def _event_loop(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._engines = {}
+                self._pid = os.getpid()
+                threading.Thread(
+                    target=self._loop.run_forever, name="async-reads", daemon=True
+                ).start()
+            return self._loop
+
+    def _engine(self, url):
+        # The event loop comes first: a fork discards the parent's engines.
+        self._event_loop()
+        with self._lock:
+            engine = self._engines.get(url)
+            if engine is None:
+                # Imported here so the sync-only configuration never loads it.
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                async_url = make_url(url)
+                backend = async_url.get_backend_name()
+                async_url = async_url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+                options = dict(current_app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+                if backend == "sqlite" and "pool_size" in options:
+                    # aiosqlite defaults to NullPool, which takes no sizing.
+                    options.setdefault("poolclass", AsyncAdaptedQueuePool)
+                engine = self._engines[url] = create_async_engine(async_url, **options)
+            return engine
+
+
+def _copy_outcome(task, future):
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
@@ -0,0 +1,308 @@
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from flask import Blueprint, current_app, jsonify, request, url_for
+from sqlalchemy import select
+
+from routing import read_only
+
+bp = Blueprint("autocomplete", __name__)
+
+KINDS = ("venue", "artist")
+
+# Word starts past this offset are not indexed; an entry keeps it in 8 bits.
+MAX_OFFSET = 255
+
+
+def normalize(text):
+    """Lowercase, without accents, with every run of punctuation a single space."""
+    text = text or ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+# ----------------------------------------------------------------------------#
+# Index.
+# ----------------------------------------------------------------------------#
+class PrefixIndex:
+    """Venue and artist names, searchable by the prefix of any of their words.
+
+    Every name gets a slot holding its normalized form, its display form and
+    its kind and id. Per kind, the index proper is a sorted array of 64-bit
+    entries, (slot << 8) | offset, one per word start, ordered by the
+    normalized name from that offset on, and a second one of just the
+    offset 0 entries, so names that start with the query are found without
+    wading through other word matches. A lookup is a binary search and a
+    scan of about ``limit`` entries per array. One more array,
+    (kind and id << 32) | slot, finds a name's slot on update. Per name that
+    is two strings plus 8 bytes per word and 24 more, with no per-entry
+    objects. Removed slots are reused.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._names = []
+        self._refs = array("q")
+        self._slots = array("Q")
+        self._free = []
+        self._starts = [array("Q") for _ in KINDS]
+        self._entries = [array("Q") for _ in KINDS]
+
+    def __len__(self):
+        return len(self._slots)
+
+    def count(self, kind):
+        return len(self._starts[KINDS.index(kind)])
+
+    def _suffix(self, entry):
+        return self._keys[entry >> 8][entry & 0xFF :]
+
+    def _word_entries(self, slot):
+        entries, offset = [], 0
+        for word in self._keys[slot].split(" "):
+            if offset > MAX_OFFSET:
+                break
+            entries.append((slot << 8) | offset)
+            offset += len(word) + 1
+        return entries
+
+    @staticmethod
+    def _ref(kind, id):
+        return id * len(KINDS) + KINDS.index(kind)
+
+    def _add_entry(self, entries, entry):
+        entries.insert(bisect_left(entries, self._suffix(entry), key=self._suffix), entry)
+
+    def _remove_entry(self, entries, entry):
+        position = bisect_left(entries, self._suffix(entry), key=self._suffix)
+        while entries[position] != entry:
+            position += 1
+        del entries[position]
+
+    def _insert(self, kind, id, name):
+        ref = self._ref(kind, id)
+        key = normalize(name)
+        slot = self._free.pop() if self._free else len(self._keys)
+        if slot == len(self._keys):
+            self._keys.append(key)
+            self._names.append(name)
+            self._refs.append(ref)
+        else:
+            self._keys[slot], self._names[slot] = key, name
+            self._refs[slot] = ref
+        self._slots.insert(bisect_left(self._slots, ref << 32), (ref << 32) | slot)
+        entries = self._word_entries(slot)
+        self._add_entry(self._starts[ref % len(KINDS)], entries[0])
+        for entry in entries:
+            self._add_entry(self._entries[ref % len(KINDS)], entry)
+
+    def _remove(self, kind, id):
+        ref = self._ref(kind, id)
+        position = bisect_left(self._slots, ref << 32)
+        if position == len(self._slots) or self._slots[position] >> 32 != ref:
+            return
+        slot = self._slots.pop(position) & 0xFFFFFFFF
+        entries = self._word_entries(slot)
+        self._remove_entry(self._starts[ref % len(KINDS)], entries[0])
+        for entry in entries:
+            self._remove_entry(self._entries[ref % len(KINDS)], entry)
+        self._keys[slot] = self._names[slot] = ""
+        self._refs[slot] = -1
+        self._free.append(slot)
+
+    def load(self, rows):
+        """Replace the contents with ``rows`` of (kind, id, name), sorting once."""
+        keys, names, refs = [], [], array("q")
+        for kind, id, name in rows:
+            keys.append(normalize(name))
+            names.append(name)
+            refs.append(self._ref(kind, id))
+        with self._lock:
+            self._keys, self._names, self._refs, self._free = keys, names, refs, []
+            self._slots = array("Q", sorted((ref << 32) | slot for slot, ref in enumerate(refs)))
+            for number in range(len(KINDS)):
+                slots = [slot for slot, ref in enumerate(refs) if ref % len(KINDS) == number]
+                slots.sort(key=keys.__getitem__)
+                self._starts[number] = array("Q", (slot << 8 for slot in slots))
+                entries = [entry for slot in slots for entry in self._word_entries(slot)]
+                entries.sort(key=self._suffix)
+                self._entries[number] = array("Q", entries)
+
+    def put(self, kind, id, name):
+        with self._lock:
+            self._remove(kind, id)
+            self._insert(kind, id, name)
+
+    def remove(self, kind, id):
+        with self._lock:
+            self._remove(kind, id)
+
+    def names(self, kind):
+        """{id: name} of every ``kind`` in the index."""
+        number = KINDS.index(kind)
+        with self._lock:
+            return {
+                (slots >> 32) // len(KINDS): self._names[slots & 0xFFFFFFFF]
+                for slots in self._slots
+                if (slots >> 32) % len(KINDS) == number
+            }
+
+    def _scan(self, entries, prefix, limit, seen):
+        position = bisect_left(entries, prefix, key=self._suffix)
+        matches = []
+        while position < len(entries) and len(matches) < limit:
+            entry = entries[position]
+            position += 1
+            if not self._suffix(entry).startswith(prefix):
+                break
+            if entry >> 8 not in seen:
+                seen.add(entry >> 8)
+                matches.append(entry)
+        return matches
+
+    def search(self, query, limit=10, kind=None):
+        """Up to ``limit`` (kind, id, name) whose words start with ``query``.
+
+        Names that start with the query come first, then other word matches,
+        each group alphabetical.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        kinds = range(len(KINDS)) if kind is None else (KINDS.index(kind),)
+        found, seen = [], set()
+        with self._lock:
+            for arrays in (self._starts, self._entries):
+                group = []
+                for number in kinds:
+                    group += self._scan(arrays[number], prefix, limit - len(found), seen)
+                found += sorted(group, key=self._suffix)[: limit - len(found)]
+            results = []
+            for entry in found:
+                ref = self._refs[entry >> 8]
+                kind, id = KINDS[ref % len(KINDS)], ref // len(KINDS)
+                results.append((kind, id, self._names[entry >> 8]))
+        return results
+
+
+# ----------------------------------------------------------------------------#
+# Extension.
+# ----------------------------------------------------------------------------#
+class Autocomplete:
+    """The per-process name index behind /api/autocomplete.
+
+    Built from the database on the first lookup in each worker, so startup
+    never touches the database. Write handlers update the index of the
+    worker that served them at once; other workers notice the change from
+    the tables' TableVersion rows, which versions.py bumps on every write,
+    checked at most every AUTOCOMPLETE_REFRESH_SECONDS, and then compare
+    the table's ids and names with the index and apply the difference.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.db = None
+        self.index = PrefixIndex()
+        self._lock = threading.Lock()
+        self._versions = None
+        self._next_check = 0.0
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.db = db
+        app.config.setdefault("AUTOCOMPLETE_LIMIT", 10)
+        app.config.setdefault("AUTOCOMPLETE_REFRESH_SECONDS", 5)
+        app.extensions["autocomplete"] = self
+
+    @staticmethod
+    def _models():
+        # Imported here, as extensions.py imports this module.
+        from models import Artist, Venue
+
+        return {"venue": Venue, "artist": Artist}
+
+    def _table_versions(self):
+        from models import TableVersion
+
+        tables = {model.__tablename__: kind for kind, model in self._models().items()}
+        rows = self.db.session.execute(
+            select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables))
+        )
+        return {tables[name]: version for name, version in rows}
+
+    def refresh(self):
+        """Bring the index up to date with the database if it may be stale."""
+        if time.monotonic() < self._next_check:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            versions = self._table_versions()
+            if self._versions is None:
+                self.load()
+            else:
+                for kind, model in self._models().items():
+                    if versions.get(kind) != self._versions.get(kind):
+                        self._sync(kind, model)
+            self._versions = versions
+            self._next_check = time.monotonic() + current_app.config["AUTOCOMPLETE_REFRESH_SECONDS"]
+
+    def _sync(self, kind, model):
+        # A version counts writes, not when they committed, so rather than
+        # pull the rows changed since some time, every name is compared.
+        indexed = self.index.names(kind)
+        for id, name in self.db.session.execute(select(model.id, model.name)):
+            if indexed.pop(id, None) != name:
+                self.index.put(kind, id, name)
+        for id in indexed:
+            self.index.remove(kind, id)
+
+    def load(self):
+        self.index.load(
+            (kind, id, name)
+            for kind, model in self._models().items()
+            for id, name in self.db.session.execute(select(model.id, model.name))
+        )
+
+    def put(self, kind, id, name):
+        if self._versions is not None:
+            self.index.put(kind, id, name)
+
+    def remove(self, kind, id):
+        if self._versions is not None:
+            self.index.remove(kind, id)
+
+
+# ----------------------------------------------------------------------------#
+# Endpoint.
+# ----------------------------------------------------------------------------#
+@bp.route("/api/autocomplete")
+@read_only
+def autocomplete_names():
+    """Venue and artist names matching ?q=, optionally only ?type=venue|artist."""
+    autocomplete = current_app.extensions["autocomplete"]
+    only = request.args.get("type")
+    if only not in KINDS:
+        only = None
+    limit = request.args.get("limit", current_app.config["AUTOCOMPLETE_LIMIT"], type=int)
+    limit = max(1, min(limit, current_app.config["AUTOCOMPLETE_LIMIT"]))
+    autocomplete.refresh()
+    results = [
+        {
+            "type": kind,
+            "id": id,
+            "name": name,
+            "url": url_for(f"{kind}s.show_{kind}", **{f"{kind}_id": id}),
+        }
+        for kind, id, name in autocomplete.index.search(request.args.get("q", ""), limit, only)
+    ]
+    response = jsonify(query=request.args.get("q", ""), results=results)
+    response.cache_control.max_age = 10
+    return response
@@ -0,0 +1,8 @@
+"""Offline benchmarks for Fyyur.
+
+    python -m bench.run --scale small --output bench-results.json
+
+seeds a database (SQLite by default, or DATABASE_URL) with synthetic data,
+drives every route through the Flask test client and writes latency, query
+count and memory figures as JSON for comparison between commits.
+"""
@@ -0,0 +1,101 @@
+"""Memory and lookup time of the autocomplete index.
+
+    python -m bench.autocomplete --names 100000
+
+Builds the index behind /api/autocomplete from ``--names`` synthetic venue
+and artist names, named like bench.seed names them, without a database.
+Reports the memory the index holds per name (tracemalloc, so the names
+themselves are included) and lookup latency percentiles for prefixes of one
+to six characters taken from the indexed words, then for an incremental
+put and remove. Exits non-zero when ``--max-bytes-per-name`` or
+``--max-p99-us`` are given and exceeded.
+"""
+import argparse
+import gc
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from bench.run import _percentile
+from bench.seed import NOUNS, WORDS
+
+
+def _names(rng, count):
+    for n in range(count):
+        if n % 5 == 0:
+            yield "venue", n, f"The {rng.choice(WORDS)} {rng.choice(NOUNS)} {n}"
+        else:
+            yield "artist", n, f"{rng.choice(WORDS)} {rng.choice(NOUNS)}s {n}"
+
+
+def _timed(call, samples):
+    timings = []
+    for args in samples:
+        started = time.perf_counter()
+        call(*args)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--names", type=int, default=100_000, help="Names to index.")
+    parser.add_argument("--lookups", type=int, default=10_000, help="Lookups to time.")
+    parser.add_argument("--max-bytes-per-name", type=float, help="Fail above this.")
+    parser.add_argument("--max-p99-us", type=float, help="Fail when lookups' p99 is above this.")
+    args = parser.parse_args(argv)
+
+    from autocomplete import PrefixIndex
+
+    rng = random.Random(42)
+    rows = list(_names(rng, args.names))
+    started = time.perf_counter()
+    PrefixIndex().load(rows)
+    build = time.perf_counter() - started
+    # Built again under tracemalloc, which slows allocation down severalfold.
+    index = PrefixIndex()
+    gc.collect()
+    tracemalloc.start()
+    index.load(rows)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    per_name = held / args.names
+
+    words = [word.lower() for word in WORDS + NOUNS] + [str(n) for n in range(1, 100)]
+    prefixes = [rng.choice(words)[: rng.randint(1, 6)] for _ in range(args.lookups)]
+    lookups = _timed(index.search, [(prefix, 10) for prefix in prefixes])
+    filtered = _timed(index.search, [(prefix, 10, "venue") for prefix in prefixes])
+    updates = [("artist", args.names + n, f"Neon Owls {n}") for n in range(1000)]
+    puts = _timed(index.put, updates)
+    removes = _timed(index.remove, [(kind, id) for kind, id, _ in updates])
+
+    print(f"{args.names} names built in {build * 1000:.0f}ms, {held / 2**20:.1f}MB held")
+    print(f"{per_name:.0f} bytes per name")
+    print(f"{'operation':16} {'p50':>9} {'p99':>9} {'max':>9}")
+    for label, timings in (
+        ("search", lookups),
+        ("search venues", filtered),
+        ("put", puts),
+        ("remove", removes),
+    ):
+        print(
+            f"{label:16} {statistics.median(timings):7.1f}us "
+            f"{_percentile(timings, 99):7.1f}us {max(timings):7.1f}us"
+        )
+
+    failures = []
+    if args.max_bytes_per_name is not None and per_name > args.max_bytes_per_name:
+        failures.append(f"{per_name:.0f} bytes per name, budget {args.max_bytes_per_name:.0f}")
+    p99 = _percentile(lookups, 99)
+    if args.max_p99_us is not None and p99 > args.max_p99_us:
+        failures.append(f"lookup p99 {p99:.1f}us, budget {args.max_p99_us:.1f}us")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""First-request latency of a new worker, with and without compiled templates.
+
+    python -m bench.coldstart --scale small
+
+Each run is a fresh interpreter, like a newly forked or recycled worker,
+that builds the application and requests every page of bench.run once and
+then once more, with the page cache disabled. Three setups are compared:
+no bytecode cache (every template compiled on first render), a bytecode
+cache filled by ``flask templates precompile``, and that cache plus
+TEMPLATE_WARMUP. Reports create_app() time and the first and second
+request to each page; the difference between the two is what a cold
+worker adds.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = """
+import json, sys, time
+urls = json.loads(sys.argv[1])
+import app
+started = time.perf_counter()
+application = app.create_app(CACHE_TYPE="null")
+created = time.perf_counter()
+client = application.test_client()
+timings = {}
+for url in urls:
+    first = time.perf_counter()
+    client.get(url)
+    second = time.perf_counter()
+    client.get(url)
+    timings[url] = ((second - first) * 1000, (time.perf_counter() - second) * 1000)
+print(json.dumps({"create_app_ms": (created - started) * 1000, "timings": timings}))
+"""
+
+
+def run_once(env, urls):
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE, json.dumps(urls)], env=env, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--scale", default="small", help="tiny, small, medium or large")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per setup.")
+    args = parser.parse_args(argv)
+
+    # config.py reads the environment at import time.
+    os.environ["DATABASE_URL"] = args.database
+    from app import create_app
+    from bench.run import _routes
+    from bench.seed import seed
+    from extensions import db
+    from models import Venue
+    from templating import compile_templates
+
+    app = create_app(CACHE_TYPE="null", TEMPLATE_CACHE_DIR="")
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            seed(db, args.scale)
+    urls = [url for _, method, url, _ in _routes(app, db) if method == "GET"]
+
+    cache_dir = tempfile.mkdtemp(prefix="fyyur-jinja-")
+    try:
+        compile_templates(create_app(CACHE_TYPE="null", TEMPLATE_CACHE_DIR=cache_dir))
+        setups = {
+            "compile": {"TEMPLATE_CACHE_DIR": "", "TEMPLATE_WARMUP": "0"},
+            "bytecode": {"TEMPLATE_CACHE_DIR": cache_dir, "TEMPLATE_WARMUP": "0"},
+            "warmup": {"TEMPLATE_CACHE_DIR": cache_dir, "TEMPLATE_WARMUP": "1"},
+        }
+        results = {
+            name: [run_once(dict(os.environ, **setup), urls) for _ in range(args.runs)]
+            for name, setup in setups.items()
+        }
+    finally:
+        shutil.rmtree(cache_dir)
+
+    print(f"{'setup':9} {'create_app':>11} {'1st total':>10} {'1st p99':>9} {'2nd total':>10}")
+    for name, runs in results.items():
+        create_ms = statistics.median(run["create_app_ms"] for run in runs)
+        firsts = [sum(run["timings"][url][0] for url in urls) for run in runs]
+        seconds = [sum(run["timings"][url][1] for url in urls) for run in runs]
+        worst = [max(run["timings"][url][0] for url in urls) for run in runs]
+        print(
+            f"{name:9} {create_ms:9.1f}ms {statistics.median(firsts):8.1f}ms "
+            f"{statistics.median(worst):7.1f}ms {statistics.median(seconds):8.1f}ms"
+        )
+    print()
+    print(f"first request per page, median ms ({', '.join(results)})")
+    for url in urls:
+        medians = [
+            statistics.median(run["timings"][url][0] for run in runs) for runs in results.values()
+        ]
+        print(f"  {url[:48]:48} " + " ".join(f"{median:8.1f}" for median in medians))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
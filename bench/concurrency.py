@@ -0,0 +1,103 @@
+"""Throughput of one worker on the venue and artist pages, sync vs async reads.
+
+    python -m bench.concurrency --scale small --threads 8
+
+Serves the detail pages of the busiest venues and artists from one
+application object with ``--threads`` client threads, which is what a
+threaded worker does, once with ASYNC_READS off and once on, with the page
+cache disabled. Reports requests per second and latency percentiles. The
+async path overlaps each page's queries, so its gain grows with the round
+trip to the database: run it against Postgres over a real network to see
+what production would.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+from bench.run import _percentile
+
+
+def _urls(db, count):
+    from sqlalchemy import func, select
+
+    from models import Show
+
+    urls = []
+    for prefix, column in (("/venues", Show.venue_id), ("/artists", Show.artist_id)):
+        ids = db.session.scalars(
+            select(column).group_by(column).order_by(func.count().desc()).limit(count)
+        )
+        urls.extend(f"{prefix}/{id}" for id in ids)
+    return urls
+
+
+def drive(app, urls, threads, requests):
+    """(requests per second, latencies in ms) for ``requests`` per thread."""
+    latencies = []
+    errors = []
+
+    def client_thread(offset):
+        client = app.test_client()
+        for number in range(requests):
+            url = urls[(offset + number) % len(urls)]
+            started = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors.append(f"GET {url} answered {response.status_code}")
+
+    workers = [threading.Thread(target=client_thread, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise RuntimeError(errors[0])
+    return len(latencies) / elapsed, latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--scale", default="small", help="tiny, small, medium or large")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent client threads.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per thread.")
+    parser.add_argument("--pages", type=int, default=20, help="Venues and artists to cycle over.")
+    args = parser.parse_args(argv)
+
+    # config.py reads the environment at import time.
+    os.environ["DATABASE_URL"] = args.database
+    from app import create_app
+    from bench.seed import seed
+    from extensions import db
+    from models import Venue
+
+    apps = {
+        mode: create_app(CACHE_TYPE="null", ASYNC_READS=mode == "async")
+        for mode in ("sync", "async")
+    }
+    with apps["sync"].app_context():
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            seed(db, args.scale)
+        urls = _urls(db, args.pages)
+
+    print(f"{args.threads} threads x {args.requests} requests over {len(urls)} pages")
+    print(f"{'mode':6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for mode, app in apps.items():
+        drive(app, urls, args.threads, 2)
+        throughput, latencies = drive(app, urls, args.threads, args.requests)
+        print(
+            f"{mode:6} {throughput:8.1f} {statistics.median(latencies):7.2f}ms "
+            f"{_percentile(latencies, 95):7.2f}ms {_percentile(latencies, 99):7.2f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Check the conditional GETs of the list and detail pages.
+
+    python -m bench.conditional --scale small
+
+For /venues, /artists, /shows and a venue and an artist page: a GET
+answers 200 with an ETag and Last-Modified, a GET with that ETag in
+If-None-Match (or that date in If-Modified-Since) answers 304 after
+exactly one query, and one with pending flash messages runs the view
+instead. Then edits a venue, adds a show and deletes it again, checking
+after each write that exactly the pages it changes answer 200 with a new
+ETag and the others still 304. Exits non-zero on any failure; the venue
+and artist it creates are deleted at the end.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+NAME_PREFIX = "Bench Conditional"
+LISTS = ("/venues", "/artists", "/shows")
+
+
+class Checker:
+    def __init__(self, client):
+        self.client = client
+        self.failures = []
+
+    def fail(self, message):
+        self.failures.append(message)
+        print(f"FAIL: {message}", file=sys.stderr)
+
+    def etags(self, urls):
+        etags = {}
+        for url in urls:
+            response = self.client.get(url)
+            if response.status_code != 200 or not response.get_etag()[0]:
+                self.fail(f"GET {url} answered {response.status_code} without an ETag")
+            elif response.last_modified is None:
+                self.fail(f"GET {url} has no Last-Modified")
+            etags[url] = (response.get_etag()[0], response.headers.get("Last-Modified"))
+        return etags
+
+    def not_modified(self, url, etag, last_modified):
+        from queries import count_queries
+
+        with count_queries() as counter:
+            response = self.client.get(url, headers={"If-None-Match": f'"{etag}"'})
+        if response.status_code != 304:
+            self.fail(f"GET {url} with its ETag answered {response.status_code}, not 304")
+        elif counter.count != 1:
+            self.fail(f"304 for {url} took {counter.count} queries, not 1")
+        response = self.client.get(url, headers={"If-Modified-Since": last_modified})
+        if response.status_code != 304:
+            self.fail(f"GET {url} with its Last-Modified answered {response.status_code}, not 304")
+
+    def flashes_bypass(self, url, etag):
+        with self.client.session_transaction() as session:
+            session["_flashes"] = [("message", "Bench flash")]
+        response = self.client.get(url, headers={"If-None-Match": f'"{etag}"'})
+        if response.status_code != 200 or "Bench flash" not in response.get_data(as_text=True):
+            self.fail(f"GET {url} with a pending flash answered {response.status_code}")
+
+    def after_write(self, write, before, changed):
+        """Check that ``write`` changes the ETags of ``changed`` and only those."""
+        write()
+        for url, (etag, last_modified) in before.items():
+            response = self.client.get(url, headers={"If-None-Match": f'"{etag}"'})
+            if url in changed:
+                if response.status_code != 200 or response.get_etag()[0] == etag:
+                    self.fail(f"{url} still answers {response.status_code} to its old ETag")
+            elif response.status_code != 304:
+                self.fail(f"{url} answered {response.status_code} though it did not change")
+        return self.etags(before)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--scale", default="small", help="tiny, small, medium or large")
+    args = parser.parse_args(argv)
+
+    # config.py reads the environment at import time.
+    os.environ["DATABASE_URL"] = args.database
+    from app import create_app
+    from bench.edits import ROWS
+    from bench.seed import seed
+    from extensions import db
+    from models import Artist, Show, Venue
+
+    app = create_app(CACHE_TYPE="null")
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            seed(db, args.scale)
+        venue = Venue(**dict(ROWS["venue"], name=f"{NAME_PREFIX} Venue"))
+        artist = Artist(**dict(ROWS["artist"], name=f"{NAME_PREFIX} Artist"))
+        db.session.add_all((venue, artist))
+        db.session.commit()
+        venue_id, artist_id = venue.id, artist.id
+
+    checker = Checker(app.test_client())
+    venue_url, artist_url = f"/venues/{venue_id}", f"/artists/{artist_id}"
+    urls = (*LISTS, venue_url, artist_url)
+
+    def in_app(work):
+        def write():
+            with app.app_context():
+                work()
+                db.session.commit()
+
+        return write
+
+    def rename_venue():
+        db.session.get(Venue, venue_id).name = f"{NAME_PREFIX} Venue renamed"
+
+    def add_show():
+        start_time = datetime(2099, 1, 1, 20)
+        db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time))
+
+    def delete_show():
+        db.session.delete(db.session.query(Show).filter_by(venue_id=venue_id).one())
+
+    try:
+        etags = checker.etags(urls)
+        for url, (etag, last_modified) in etags.items():
+            checker.not_modified(url, etag, last_modified)
+        checker.flashes_bypass("/venues", etags["/venues"][0])
+        etags = checker.after_write(in_app(rename_venue), etags, {"/venues", "/shows", venue_url})
+        etags = checker.after_write(in_app(add_show), etags, set(urls))
+        checker.after_write(in_app(delete_show), etags, set(urls))
+    finally:
+        with app.app_context():
+            db.session.execute(db.delete(Show).where(Show.venue_id == venue_id))
+            db.session.execute(db.delete(Venue).where(Venue.id == venue_id))
+            db.session.execute(db.delete(Artist).where(Artist.id == artist_id))
+            db.session.commit()
+
+    print(f"{len(urls)} pages checked, {len(checker.failures)} failures")
+    return 1 if checker.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
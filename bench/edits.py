@@ -0,0 +1,175 @@
+"""Concurrent edits of the same venue and artist.
+
+    python -m bench.edits --threads 8 --edits 50
+
+Lists a venue and an artist, then has ``--threads`` clients edit them at
+once through the test client, each edit the browser round trip: GET the
+edit form for its CSRF token and version, then POST it with one field
+changed. An edit whose form went stale in between must be refused with the
+conflict flash rather than overwrite the one that got in first. Checks that
+the version moved by exactly the number of edits accepted (none lost, none
+counted twice) and that every UPDATE sent names only the edited field,
+updated_at and version. Reports edits accepted and refused and latency
+percentiles; the rows it lists are deleted at the end.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+
+from bench.run import _percentile
+
+NAME_PREFIX = "Bench Edits"
+TOKEN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+VERSION = re.compile(r'name="version"[^>]*value="([^"]+)"')
+UPDATE = re.compile(r'UPDATE "(Venue|Artist)" SET (.*?) WHERE', re.S)
+ROWS = {
+    "venue": {
+        "name": f"{NAME_PREFIX} Venue",
+        "city": "Austin",
+        "state": "TX",
+        "address": "1 Bench Street",
+        "phone": "512-5555-0100",
+        "genres": ["Jazz", "Folk"],
+        "image_link": "https://example.com/venue.png",
+        "facebook_link": "https://facebook.com/bench",
+        "website_link": "https://example.com",
+        "seeking_talent": True,
+        "seeking_description": "",
+    },
+    "artist": {
+        "name": f"{NAME_PREFIX} Artist",
+        "city": "Austin",
+        "state": "TX",
+        "phone": "512-5555-0101",
+        "genres": ["Jazz"],
+        "image_link": "https://example.com/artist.png",
+        "facebook_link": "https://facebook.com/bench",
+        "website_link": "https://example.com",
+        "seeking_venue": False,
+        "seeking_description": "",
+    },
+}
+EXPECTED_SET = {"seeking_description", "updated_at", "version"}
+
+
+def _form_data(row, token, version, description):
+    data = {
+        name: ("y" if value else None) if isinstance(value, bool) else value
+        for name, value in row.items()
+    }
+    data = {name: value for name, value in data.items() if value is not None}
+    return dict(data, csrf_token=token, version=version, seeking_description=description)
+
+
+def edit(client, kind, id, row, description):
+    """True if the edit was saved, False if it was refused as stale."""
+    page = client.get(f"/{kind}s/{id}/edit").get_data(as_text=True)
+    token, version = TOKEN.search(page).group(1), VERSION.search(page).group(1)
+    client.post(f"/{kind}s/{id}/edit", data=_form_data(row, token, version, description))
+    with client.session_transaction() as session:
+        messages = [message for _, message in session.pop("_flashes", [])]
+    if any("successfully updated" in message for message in messages):
+        return True
+    if any("changed by someone else" in message for message in messages):
+        return False
+    raise RuntimeError(f"edit of {kind} {id} neither saved nor refused: {messages}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent editors.")
+    parser.add_argument("--edits", type=int, default=50, help="Edit attempts per thread.")
+    args = parser.parse_args(argv)
+
+    # config.py reads the environment at import time.
+    os.environ["DATABASE_URL"] = args.database
+    from sqlalchemy import event
+
+    from app import create_app
+    from extensions import db
+    from models import Artist, Venue
+
+    app = create_app(CACHE_TYPE="null")
+    models = {"venue": Venue, "artist": Artist}
+    with app.app_context():
+        db.create_all()
+        owners = {kind: model(**ROWS[kind]) for kind, model in models.items()}
+        db.session.add_all(owners.values())
+        db.session.commit()
+        ids = {kind: owner.id for kind, owner in owners.items()}
+        before = {kind: owner.version for kind, owner in owners.items()}
+        engine = db.engine
+
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        match = UPDATE.match(statement)
+        if match:
+            columns = {column.split("=")[0].strip() for column in match.group(2).split(",")}
+            updates.append((match.group(1), columns))
+
+    event.listen(engine, "before_cursor_execute", record)
+    results = {kind: [] for kind in models}
+    latencies, errors = [], []
+
+    def editor(number):
+        client = app.test_client()
+        for step in range(args.edits):
+            kind = "venue" if (number + step) % 2 == 0 else "artist"
+            started = time.perf_counter()
+            try:
+                saved = edit(client, kind, ids[kind], ROWS[kind], f"Edit {number}.{step}")
+            except Exception as error:
+                errors.append(f"{type(error).__name__}: {error}")
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            results[kind].append(saved)
+
+    editors = [threading.Thread(target=editor, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in editors:
+        thread.start()
+    for thread in editors:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "before_cursor_execute", record)
+
+    failures = []
+    with app.app_context():
+        try:
+            print(f"{args.threads} editors, {args.edits} edits each, {elapsed:.1f}s")
+            print(f"{'row':7} {'saved':>6} {'refused':>8} {'versions':>9}")
+            for kind, model in models.items():
+                saved = results[kind].count(True)
+                moved = db.session.get(model, ids[kind]).version - before[kind]
+                print(f"{kind:7} {saved:6} {results[kind].count(False):8} {moved:9}")
+                if moved != saved:
+                    failures.append(f"{kind} version moved {moved} for {saved} saved edits")
+            if latencies:
+                print(
+                    f"round trip p50 {statistics.median(latencies):.1f}ms, "
+                    f"p99 {_percentile(latencies, 99):.1f}ms"
+                )
+            columns = set().union(*(names for _, names in updates))
+            print(f"{len(updates)} UPDATEs, setting {', '.join(sorted(columns)) or 'nothing'}")
+            if columns - EXPECTED_SET:
+                failures.append(f"UPDATEs set {', '.join(sorted(columns - EXPECTED_SET))} as well")
+        finally:
+            for owner in (db.session.get(model, ids[kind]) for kind, model in models.items()):
+                db.session.delete(owner)
+            db.session.commit()
+
+    if errors:
+        failures.append(f"{len(errors)} edits failed, e.g. {errors[0]}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
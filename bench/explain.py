@@ -0,0 +1,110 @@
+"""Check that the hot Show queries are served by indexes.
+
+    python -m bench.explain --scale small
+
+Runs the venue and artist detail pages and calendars, /venues and a search
+against the benchmark database, captures the SQL they send, and EXPLAINs
+each statement that reads "Show". Exits non-zero if any of them scans the
+Show table instead of using one of its indexes. Use
+benchmark scale: on a near-empty table Postgres rightly prefers a seq scan.
+"""
+import argparse
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ROUTES = (
+    "show_venue_busiest",
+    "show_artist_busiest",
+    "venues",
+    "search_venues",
+    "venue_calendar_busiest",
+    "artist_calendar_busiest",
+)
+
+
+@contextmanager
+def capture_statements():
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_execute)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def table_scans(connection, statement, parameters):
+    """Plan lines that read "Show" without an index."""
+    if connection.dialect.name == "postgresql":
+        result = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = result.scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return [
+            f"Seq Scan on {node['Relation Name']}"
+            for node in _plan_nodes(plan[0]["Plan"])
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "Show"
+        ]
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+    return [
+        row.detail
+        for row in rows
+        if row.detail.startswith("SCAN Show") and "USING" not in row.detail
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--scale", default="small", help="tiny, small, medium or large")
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.database
+    from app import create_app
+    from bench.run import _routes
+    from bench.seed import seed
+    from extensions import db
+
+    app = create_app(CACHE_TYPE="null")
+    with app.app_context():
+        from models import Venue
+
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            seed(db, args.scale)
+
+    client = app.test_client()
+    failures = 0
+    for name, method, url, data in _routes(app, db):
+        if name not in ROUTES:
+            continue
+        with capture_statements() as statements:
+            client.open(url, method=method, data=data)
+        with app.app_context(), db.engine.connect() as connection:
+            for statement, parameters in statements:
+                if '"Show"' not in statement:
+                    continue
+                scans = table_scans(connection, statement, parameters)
+                status = "FAIL" if scans else "ok"
+                failures += bool(scans)
+                print(f"{status:4} {name:22} {' '.join(statement.split())[:90]}")
+                for scan in scans:
+                    print(f"       {scan}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Stream the full show export as the Show table grows.
+
+    python -m bench.export --shows 2000000
+
+Fills a throwaway SQLite database (or ``--database``, which should be one
+too: shows are added to it) to ``--shows`` shows in ``--steps`` steps. At
+each size it streams all of /export/shows.ndjson and /export/shows.csv in a
+fresh interpreter and reports rows per second and how far the peak RSS of
+that process rose while serving the export. The export streams from a
+server-side cursor, so that rise must not grow with the table: the run
+fails if it is more than ``--tolerance-mb`` larger at the last size than at
+the first, or if an export is missing rows.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+FORMATS = ("ndjson", "csv")
+OWNERS = 1_000
+BATCH_SIZE = 10_000
+
+
+def _peak_rss_mb():
+    from bench.run import _peak_rss_mb
+
+    return _peak_rss_mb()
+
+
+def fill(db, shows):
+    """Add shows until there are ``shows``; every slot books each venue and
+    artist once, paired differently in each slot, so nothing overlaps."""
+    from datetime import datetime
+
+    from sqlalchemy import func, insert, select
+
+    from bench.seed import _artist, _venue
+    from models import DEFAULT_SHOW_DURATION, Artist, Show, Venue
+
+    if db.session.query(Venue.id).first() is None:
+        rng = random.Random(42)
+        db.session.execute(insert(Venue), [_venue(rng, n) for n in range(1, OWNERS + 1)])
+        db.session.execute(insert(Artist), [_artist(rng, n) for n in range(1, OWNERS + 1)])
+        db.session.commit()
+    first_slot = datetime(2000, 1, 1)
+    for start in range(db.session.scalar(select(func.count(Show.id))), shows, BATCH_SIZE):
+        rows = []
+        for number in range(start, min(start + BATCH_SIZE, shows)):
+            slot, owner = divmod(number, OWNERS)
+            start_time = first_slot + slot * DEFAULT_SHOW_DURATION
+            rows.append(
+                {
+                    "venue_id": owner + 1,
+                    "artist_id": (owner + slot) % OWNERS + 1,
+                    "start_time": start_time,
+                    "end_time": start_time + DEFAULT_SHOW_DURATION,
+                }
+            )
+        db.session.execute(insert(Show), rows)
+        db.session.commit()
+
+
+def serve(format):
+    """Stream the whole export in this process: rows, seconds and RSS rise in MB."""
+    from app import create_app
+
+    client = create_app(CACHE_TYPE="null").test_client()
+    # An empty export first, so imports and the engine are not counted.
+    client.get(f"/export/shows.{format}?start=2999-01-01").get_data()
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    response = client.get(f"/export/shows.{format}", buffered=False)
+    lines = sum(chunk.count(b"\n") for chunk in response.response)
+    elapsed = time.perf_counter() - started
+    response.close()
+    if response.status_code != 200:
+        raise RuntimeError(f"GET /export/shows.{format} answered {response.status_code}")
+    # The CSV starts with a header line.
+    rows = lines - (format == "csv")
+    return {"rows": rows, "seconds": elapsed, "rss_mb": _peak_rss_mb() - baseline}
+
+
+def measure(database, format):
+    """serve() in a fresh interpreter, whose peak RSS is this export's alone."""
+    output = subprocess.run(
+        [sys.executable, "-m", "bench.export", "--database", database, "--serve", format],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", help="Default: a throwaway SQLite file.")
+    parser.add_argument("--shows", type=int, default=2_000_000, help="Shows at the last step.")
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--tolerance-mb", type=float, default=20)
+    parser.add_argument("--serve", choices=FORMATS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    directory = None
+    if args.database is None:
+        directory = tempfile.mkdtemp(prefix="fyyur-export-")
+        args.database = f"sqlite:///{os.path.join(directory, 'export.db')}"
+    # config.py reads the environment at import time.
+    os.environ["DATABASE_URL"] = args.database
+    if args.serve:
+        print(json.dumps(serve(args.serve)))
+        return 0
+
+    from app import create_app
+    from extensions import db
+
+    app = create_app(CACHE_TYPE="null")
+    sizes = [args.shows * step // args.steps for step in range(1, args.steps + 1)]
+    results, failures = {format: [] for format in FORMATS}, []
+    try:
+        print(f"{'shows':>10} {'format':>7} {'rows/s':>10} {'RSS rise':>9}")
+        for size in sizes:
+            with app.app_context():
+                db.create_all()
+                fill(db, size)
+            for format in FORMATS:
+                result = measure(args.database, format)
+                results[format].append(result)
+                print(
+                    f"{size:10} {format:>7} {result['rows'] / result['seconds']:10.0f} "
+                    f"{result['rss_mb']:7.1f}MB"
+                )
+                if result["rows"] < size:
+                    failures.append(f"shows.{format} had {result['rows']} of {size} rows")
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        if directory:
+            shutil.rmtree(directory)
+
+    for format, runs in results.items():
+        growth = runs[-1]["rss_mb"] - runs[0]["rss_mb"]
+        if growth > args.tolerance_mb:
+            failures.append(
+                f"shows.{format} peak RSS rose {growth:.1f}MB more at {sizes[-1]} shows "
+                f"than at {sizes[0]}"
+            )
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
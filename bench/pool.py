@@ -0,0 +1,167 @@
+"""Load test of the connection pool settings at a target concurrency.
+
+    python -m bench.pool --scale small --threads 15 --seconds 10
+
+Drives the bench pages from ``--threads`` client threads against one
+application object with the page cache off, as a threaded worker would
+serve them, while another thread samples /debug/pool. The pool is sized by
+the DB_POOL_* settings of config.py, or by ``--pool-size``,
+``--max-overflow`` and ``--pool-timeout``. Reports requests per second,
+latency percentiles and the most connections checked out at once, and
+fails when a request times out waiting for a connection, the pool
+overflows past max_overflow, or an app built on an in-memory SQLite
+database (which takes no pool sizing) does not start. Run it against the production database
+server, with ``--threads`` at the threads a worker serves, to check the
+settings before a deploy.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+from bench.run import _percentile
+
+
+def check_in_memory(create_app):
+    """Failures building an app on an in-memory SQLite database, which takes
+    no pool sizing whatever the DB_POOL_* settings say."""
+    from extensions import db
+
+    try:
+        app = create_app(
+            SQLALCHEMY_DATABASE_URI="sqlite://", CACHE_TYPE="null", DEBUG_ENDPOINTS=True
+        )
+        with app.app_context():
+            db.create_all()
+        response = app.test_client().get("/debug/pool")
+    except TypeError as error:
+        return [f"create_app on sqlite:// failed: {error}"]
+    if response.status_code != 200:
+        return [f"/debug/pool on sqlite:// answered {response.status_code}"]
+    return []
+
+
+def sample(client, stop, interval, samples):
+    while not stop.wait(interval):
+        samples.append(client.get("/debug/pool").get_json())
+
+
+def drive(app, urls, threads, seconds):
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+    latencies, timeouts, errors = [], [], []
+    deadline = time.monotonic() + seconds
+
+    def client_thread(offset):
+        client = app.test_client()
+        step = offset
+        while time.monotonic() < deadline:
+            url = urls[step % len(urls)]
+            step += 1
+            started = time.perf_counter()
+            try:
+                response = client.get(url)
+                # Streamed pages hold their connection until read and closed.
+                response.get_data()
+                response.close()
+            except PoolTimeout as error:
+                timeouts.append(f"GET {url}: {error}")
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors.append(f"GET {url} answered {response.status_code}")
+
+    clients = [threading.Thread(target=client_thread, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    return len(latencies) / (time.perf_counter() - started), latencies, timeouts, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--scale", default="small", help="tiny, small, medium or large")
+    parser.add_argument("--threads", type=int, help="Default: pool_size + max_overflow.")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--pool-size", type=int)
+    parser.add_argument("--max-overflow", type=int)
+    parser.add_argument("--pool-timeout", type=int)
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between samples.")
+    args = parser.parse_args(argv)
+
+    # config.py reads the environment at import time.
+    os.environ["DATABASE_URL"] = args.database
+    from app import create_app
+    from bench.run import _routes
+    from bench.seed import seed
+    from extensions import db
+    from models import Venue
+
+    check_failures = check_in_memory(create_app)
+    for failure in check_failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sizing = {
+        setting: getattr(args, name)
+        for setting, name in (
+            ("DB_POOL_SIZE", "pool_size"),
+            ("DB_MAX_OVERFLOW", "max_overflow"),
+            ("DB_POOL_TIMEOUT", "pool_timeout"),
+        )
+        if getattr(args, name) is not None
+    }
+    app = create_app(CACHE_TYPE="null", DEBUG_ENDPOINTS=True, **sizing)
+    options = app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    if "pool_size" not in options:
+        print("This database URL does not use a QueuePool; nothing to check.", file=sys.stderr)
+        return 1 if check_failures else 0
+    limit = options["pool_size"] + options["max_overflow"]
+    threads = args.threads or limit
+
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            seed(db, args.scale)
+    urls = [url for _, method, url, _ in _routes(app, db) if method == "GET"]
+
+    samples, stop = [], threading.Event()
+    sampler = threading.Thread(
+        target=sample, args=(app.test_client(), stop, args.interval, samples)
+    )
+    sampler.start()
+    try:
+        throughput, latencies, timeouts, errors = drive(app, urls, threads, args.seconds)
+    finally:
+        stop.set()
+        sampler.join()
+
+    peak = max((sample["checkedout"] for sample in samples), default=0)
+    overflow = max((sample["overflow"] for sample in samples), default=0)
+    print(
+        f"pool_size {options['pool_size']}, max_overflow {options['max_overflow']}, "
+        f"pool_timeout {options['pool_timeout']}s; {threads} client threads"
+    )
+    print(f"{'req/s':>8} {'p50':>9} {'p99':>9} {'peak out':>9} {'overflow':>9} {'timeouts':>9}")
+    print(
+        f"{throughput:8.1f} {statistics.median(latencies or [0]):7.1f}ms "
+        f"{_percentile(latencies or [0], 99):7.1f}ms {peak:9} {max(overflow, 0):9} {len(timeouts):9}"
+    )
+
+    failures = []
+    if timeouts:
+        failures.append(f"{len(timeouts)} requests timed out on checkout, e.g. {timeouts[0]}")
+    if overflow > options["max_overflow"] or peak > limit:
+        failures.append(f"{peak} connections checked out, limit {limit}")
+    if errors:
+        failures.append(f"{len(errors)} failed requests, e.g. {errors[0]}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures or check_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
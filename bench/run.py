@@ -0,0 +1,323 @@
+"""Seed a benchmark database and measure every route through the test client.
+
+The write routes (create, edit and delete) run last, against a copy of the
+seeded SQLite file or, for other databases, the ``--write-database`` given,
+so that the data the read routes measure stays the same from run to run.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_DATABASE = "sqlite:///bench.db"
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _routes(app, db):
+    """(name, method, url, form data) for every route, with real ids."""
+    from sqlalchemy import func, select
+
+    from models import Venue, Artist, Show
+
+    with app.app_context():
+        busiest_venue = db.session.scalar(
+            select(Show.venue_id).group_by(Show.venue_id).order_by(func.count().desc()).limit(1)
+        )
+        busiest_artist = db.session.scalar(
+            select(Show.artist_id).group_by(Show.artist_id).order_by(func.count().desc()).limit(1)
+        )
+        quiet_venue = db.session.scalar(select(func.max(Venue.id)))
+        quiet_artist = db.session.scalar(select(func.max(Artist.id)))
+        middle = db.session.scalar(
+            select(Show.start_time)
+            .order_by(Show.start_time)
+            .offset(db.session.scalar(select(func.count(Show.id))) // 2)
+            .limit(1)
+        )
+
+    after = f"{middle.isoformat()}_0" if middle else ""
+    month = f"start={middle.date().isoformat()}" if middle else ""
+    return [
+        ("index", "GET", "/", None),
+        ("venues", "GET", "/venues", None),
+        ("venues_filtered", "GET", "/venues?genre=Jazz&state=NY", None),
+        ("show_venue_busiest", "GET", f"/venues/{busiest_venue}", None),
+        ("show_venue_quiet", "GET", f"/venues/{quiet_venue}", None),
+        ("venue_calendar_busiest", "GET", f"/venues/{busiest_venue}/calendar?{month}", None),
+        ("search_venues", "POST", "/venues/search", {"search_term": "blue"}),
+        ("search_venues_city", "POST", "/venues/search", {"search_term": "San Francisco, CA"}),
+        ("artists", "GET", "/artists", None),
+        ("artists_filtered", "GET", "/artists?genre=Jazz", None),
+        ("show_artist_busiest", "GET", f"/artists/{busiest_artist}", None),
+        ("show_artist_quiet", "GET", f"/artists/{quiet_artist}", None),
+        ("artist_calendar_busiest", "GET", f"/artists/{busiest_artist}/calendar?{month}", None),
+        ("search_artists", "POST", "/artists/search", {"search_term": "comet"}),
+        ("autocomplete", "GET", "/api/autocomplete?q=blu", None),
+        ("shows", "GET", "/shows", None),
+        ("shows_deep_page", "GET", f"/shows?after={after}", None),
+        ("create_venue_form", "GET", "/venues/create", None),
+        ("edit_venue_form", "GET", f"/venues/{quiet_venue}/edit", None),
+        ("create_artist_form", "GET", "/artists/create", None),
+        ("edit_artist_form", "GET", f"/artists/{quiet_artist}/edit", None),
+        ("create_show_form", "GET", "/shows/create", None),
+        ("export_venues_csv", "GET", "/export/venues.csv", None),
+        ("export_shows_ndjson_day", "GET", f"/export/shows.ndjson?start={after[:10]}", None),
+    ]
+
+
+def _write_routes(app, db, requests):
+    """(name, method, url, form data, expected flash) for each write route.
+
+    ``url`` and ``data`` take the request's number, so that every request
+    writes something new: venues and artists with their own names, shows
+    four hours apart, edits at the version the previous one left. The rows
+    they edit and delete are created here, before anything is timed.
+    """
+    from sqlalchemy import func, select
+
+    from bench.edits import ROWS, _form_data
+    from models import Artist, Show, Venue
+
+    with app.app_context():
+        venue = Venue(**dict(ROWS["venue"], name="Bench Run Venue"))
+        artist = Artist(**dict(ROWS["artist"], name="Bench Run Artist"))
+        doomed_rows = [dict(ROWS["venue"], name=f"Bench Run Doomed {n}") for n in range(requests)]
+        doomed = [Venue(**row) for row in doomed_rows]
+        db.session.add_all([venue, artist, *doomed])
+        db.session.commit()
+        venue_id, venue_version = venue.id, venue.version
+        artist_id, artist_version = artist.id, artist.version
+        doomed_ids = [venue.id for venue in doomed]
+        latest = db.session.scalar(select(func.max(Show.start_time)))
+    first_show = max(latest or datetime.now(), datetime.now()).replace(microsecond=0)
+
+    def listing(kind, n):
+        return {
+            name: ("y" if value else None) if isinstance(value, bool) else value
+            for name, value in dict(ROWS[kind], name=f"Bench Run {kind.title()} {n}").items()
+            if value is not False
+        }
+
+    def show(n):
+        start_time = first_show + timedelta(hours=4 * (n + 1))
+        return {
+            "venue_id": venue_id,
+            "artist_id": artist_id,
+            "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    listed = "successfully listed"
+    return [
+        ("create_venue", "POST", "/venues/create", lambda n: listing("venue", n), listed),
+        ("create_artist", "POST", "/artists/create", lambda n: listing("artist", n), listed),
+        ("create_show", "POST", "/shows/create", show, listed),
+        (
+            "edit_venue",
+            "POST",
+            f"/venues/{venue_id}/edit",
+            lambda n: _form_data(ROWS["venue"], "", venue_version + n, f"Edit {n}"),
+            "successfully updated",
+        ),
+        (
+            "edit_artist",
+            "POST",
+            f"/artists/{artist_id}/edit",
+            lambda n: _form_data(ROWS["artist"], "", artist_version + n, f"Edit {n}"),
+            "successfully updated",
+        ),
+        ("delete_venue", "DELETE", lambda n: f"/venues/{doomed_ids[n]}", None, "was deleted"),
+    ]
+
+
+def _throwaway(url):
+    """(URL, directory) of a copy of the SQLite database at ``url``, or None
+    when it is not a SQLite file."""
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    directory = tempfile.mkdtemp(prefix="fyyur-bench-")
+    copy = os.path.join(directory, "writes.db")
+    shutil.copyfile(url.database, copy)
+    return url.set(database=copy).render_as_string(hide_password=False), directory
+
+
+def measure(client, method, url, data, requests, expect=None):
+    """Timings of ``requests`` requests; ``url`` and ``data`` may be functions
+    of the request's number, and ``expect`` a flash every one must show."""
+    from queries import count_queries
+
+    latencies, queries = [], []
+    for number in range(requests):
+        request_url = url(number) if callable(url) else url
+        request_data = data(number) if callable(data) else data
+        with count_queries() as counter:
+            started = time.perf_counter()
+            response = client.open(request_url, method=method, data=request_data)
+            response.get_data()
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {request_url} answered {response.status_code}")
+        if expect is not None and expect not in response.get_data(as_text=True):
+            # Views that redirect leave their flash for the next page.
+            with client.session_transaction() as session:
+                messages = [message for _, message in session.pop("_flashes", [])]
+            if not any(expect in message for message in messages):
+                raise RuntimeError(f"{method} {request_url} did not succeed: {messages}")
+    return {
+        "method": method,
+        "url": request_url,
+        "requests": requests,
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "queries_per_request": round(statistics.fmean(queries), 2),
+        "response_bytes": len(response.get_data()),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def compare(previous, current):
+    """Print p95 and query count deltas against an earlier results file."""
+    print(f"\n{'route':28} {'p95 before':>11} {'p95 now':>9} {'change':>8} {'queries':>9}")
+    for name, now in current["routes"].items():
+        before = previous["routes"].get(name)
+        if before is None:
+            continue
+        change = (
+            (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0
+        )
+        print(
+            f"{name:28} {before['p95_ms']:>11.2f} {now['p95_ms']:>9.2f} {change:>+7.1f}% "
+            f"{before['queries_per_request']:>4.0f}->{now['queries_per_request']:<4.0f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", DEFAULT_DATABASE))
+    parser.add_argument("--scale", default="small", help="tiny, small, medium or large")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per route.")
+    parser.add_argument("--reseed", action="store_true", help="Drop and reseed the data.")
+    parser.add_argument("--cache", action="store_true", help="Keep the page cache enabled.")
+    parser.add_argument("--only", nargs="*", help="Route names to run.")
+    parser.add_argument("--output", help="Write results JSON here.")
+    parser.add_argument("--compare", help="Results JSON from an earlier run.")
+    parser.add_argument(
+        "--write-database",
+        help="Throwaway database for the write routes; default: a copy of a SQLite --database.",
+    )
+    args = parser.parse_args(argv)
+
+    # config.py reads the environment at import time.
+    os.environ["DATABASE_URL"] = args.database
+    from sqlalchemy.engine import make_url
+
+    from app import create_app
+    from bench.seed import seed
+    from extensions import db
+    from models import Venue
+
+    app = create_app(CACHE_TYPE="lru" if args.cache else "null")
+
+    with app.app_context():
+        if args.reseed:
+            db.drop_all()
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            started = time.perf_counter()
+            seed(db, args.scale)
+            print(f"seeded in {time.perf_counter() - started:.1f}s")
+        # Flask-SQLAlchemy puts a relative SQLite path in the instance folder.
+        engine_url = db.engine.url
+
+    client = app.test_client()
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "database": make_url(args.database).render_as_string(hide_password=True),
+            "scale": args.scale,
+            "requests_per_route": args.requests,
+            "cache": args.cache,
+            "python": platform.python_version(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "routes": {},
+    }
+
+    def report(name, stats):
+        results["routes"][name] = stats
+        print(
+            f"{name:28} p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+            f"p99 {stats['p99_ms']:8.2f}ms  {stats['queries_per_request']:5.1f} q/req"
+        )
+
+    for name, method, url, data in _routes(app, db):
+        if args.only and name not in args.only:
+            continue
+        report(name, measure(client, method, url, data, args.requests))
+
+    throwaway = None if args.write_database else _throwaway(engine_url)
+    write_database = args.write_database or (throwaway and throwaway[0])
+    if write_database is None:
+        print("write routes skipped: pass --write-database to run them", file=sys.stderr)
+    else:
+        # The bench posts the forms without rendering them, so without tokens.
+        writes = create_app(
+            CACHE_TYPE="lru" if args.cache else "null",
+            SQLALCHEMY_DATABASE_URI=write_database,
+            WTF_CSRF_ENABLED=False,
+        )
+        try:
+            with writes.app_context():
+                db.create_all()
+                if db.session.query(Venue.id).first() is None:
+                    seed(db, args.scale)
+            client = writes.test_client()
+            for name, method, url, data, expect in _write_routes(writes, db, args.requests):
+                if args.only and name not in args.only:
+                    continue
+                report(name, measure(client, method, url, data, args.requests, expect))
+        finally:
+            with writes.app_context():
+                db.engine.dispose()
+            if throwaway:
+                shutil.rmtree(throwaway[1])
+    results["meta"]["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
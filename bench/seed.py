@@ -0,0 +1,172 @@
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import insert
+
+SCALES = {
+    # venues, artists, shows
+    "tiny": (50, 200, 2_000),
+    "small": (1_000, 5_000, 100_000),
+    "medium": (5_000, 20_000, 500_000),
+    "large": (10_000, 50_000, 2_000_000),
+}
+
+# City populations drive how venues and artists are spread out, roughly like
+# a real listings site: a few big markets and a long tail.
+CITIES = [
+    ("New York", "NY", 30),
+    ("Los Angeles", "CA", 20),
+    ("Chicago", "IL", 12),
+    ("San Francisco", "CA", 10),
+    ("Austin", "TX", 9),
+    ("Nashville", "TN", 8),
+    ("Seattle", "WA", 7),
+    ("New Orleans", "LA", 6),
+    ("Atlanta", "GA", 5),
+    ("Denver", "CO", 4),
+    ("Boston", "MA", 4),
+    ("Portland", "OR", 3),
+    ("Detroit", "MI", 3),
+    ("Miami", "FL", 3),
+    ("Minneapolis", "MN", 2),
+    ("Kansas City", "MO", 1),
+]
+GENRES = [
+    ("Rock n Roll", 14),
+    ("Pop", 12),
+    ("Hip-Hop", 11),
+    ("Jazz", 9),
+    ("Electronic", 8),
+    ("Alternative", 8),
+    ("Country", 7),
+    ("R&B", 6),
+    ("Blues", 5),
+    ("Folk", 5),
+    ("Punk", 4),
+    ("Soul", 4),
+    ("Heavy Metal", 4),
+    ("Funk", 3),
+    ("Reggae", 3),
+    ("Classical", 3),
+    ("Instrumental", 2),
+    ("Musical Theatre", 1),
+    ("Other", 1),
+]
+WORDS = (
+    "Blue Velvet Iron Golden Electric Silver Midnight Crimson "
+    "Wild Lucky Neon Copper Hollow Rusty Paper Glass"
+).split()
+NOUNS = (
+    "Room Hall Tavern Lounge Garden Factory Cellar Theatre "
+    "Owl Tiger Harbor Canyon Engine Lantern Comet River"
+).split()
+BATCH_SIZE = 10_000
+
+
+def _zipf_weights(n, s=0.8):
+    """Cumulative weights where item i is picked in proportion to 1 / (i + 1) ** s."""
+    return list(accumulate(1 / (i + 1) ** s for i in range(n)))
+
+
+def _genres(rng):
+    names, weights = zip(*GENRES)
+    return sorted(set(rng.choices(names, weights=weights, k=rng.randint(1, 3))))
+
+
+def _place(rng):
+    city, state, _ = rng.choices(CITIES, weights=[c[2] for c in CITIES])[0]
+    return city, state
+
+
+def _venue(rng, n):
+    city, state = _place(rng)
+    return {
+        "name": f"The {rng.choice(WORDS)} {rng.choice(NOUNS)} {n}",
+        "city": city,
+        "state": state,
+        "address": f"{rng.randint(1, 9999)} Main St",
+        "phone": f"{rng.randint(100, 999)}-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        "image_link": f"https://images.example.com/venues/{n}.jpg",
+        "facebook_link": f"https://www.facebook.com/venue{n}",
+        "website_link": f"https://venue{n}.example.com",
+        "seeking_talent": rng.random() < 0.3,
+        "seeking_description": "Looking for local acts" if rng.random() < 0.3 else None,
+        "genres": _genres(rng),
+    }
+
+
+def _artist(rng, n):
+    city, state = _place(rng)
+    return {
+        "name": f"{rng.choice(WORDS)} {rng.choice(NOUNS)}s {n}",
+        "city": city,
+        "state": state,
+        "phone": f"{rng.randint(100, 999)}-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        "image_link": f"https://images.example.com/artists/{n}.jpg",
+        "facebook_link": f"https://www.facebook.com/artist{n}",
+        "website_link": f"https://artist{n}.example.com",
+        "seeking_venue": rng.random() < 0.4,
+        "seeking_description": "Touring this year" if rng.random() < 0.4 else None,
+        "genres": _genres(rng),
+    }
+
+
+def _insert(db, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(model), rows[start : start + BATCH_SIZE])
+        db.session.commit()
+
+
+def seed(db, scale="small", seed=42, log=print):
+    """Fill an empty schema with ``scale`` worth of venues, artists and shows.
+
+    Deterministic for a given seed. Venue and artist popularity is Zipf-like,
+    so a few detail pages carry thousands of shows; show times span two
+    years back and one year ahead. Shows fill slots of the default show
+    length, and a draw that would double-book a venue or artist is redrawn,
+    which caps the busiest venues and artists at one show per slot.
+    """
+    from models import DEFAULT_SHOW_DURATION, Venue, Artist, Show
+
+    rng = random.Random(seed)
+    venues, artists, shows = SCALES[scale]
+
+    log(f"seeding {venues} venues")
+    _insert(db, Venue, [_venue(rng, n) for n in range(1, venues + 1)])
+    log(f"seeding {artists} artists")
+    _insert(db, Artist, [_artist(rng, n) for n in range(1, artists + 1)])
+
+    log(f"seeding {shows} shows")
+    venue_weights = _zipf_weights(venues)
+    artist_weights = _zipf_weights(artists)
+    slots = int(timedelta(days=3 * 365) / DEFAULT_SHOW_DURATION)
+    first_slot = datetime.now().replace(minute=0, second=0, microsecond=0) - 2 * slots // 3 * (
+        DEFAULT_SHOW_DURATION
+    )
+    booked = set()
+    for start in range(0, shows, BATCH_SIZE):
+        rows = []
+        while len(rows) < min(BATCH_SIZE, shows - start):
+            venue_id = rng.choices(range(1, venues + 1), cum_weights=venue_weights)[0]
+            artist_id = rng.choices(range(1, artists + 1), cum_weights=artist_weights)[0]
+            slot = rng.randrange(slots)
+            if ("venue", venue_id, slot) in booked or ("artist", artist_id, slot) in booked:
+                continue
+            booked.update((("venue", venue_id, slot), ("artist", artist_id, slot)))
+            rows.append(
+                {
+                    "venue_id": venue_id,
+                    "artist_id": artist_id,
+                    "start_time": first_slot + slot * DEFAULT_SHOW_DURATION,
+                }
+            )
+        db.session.execute(insert(Show), rows)
+        db.session.commit()
+
+    from counters import rebuild_counters
+
+    log("counting shows")
+    rebuild_counters()
+    db.session.commit()
+    return {"venues": venues, "artists": artists, "shows": shows}
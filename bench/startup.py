@@ -0,0 +1,80 @@
+"""Measure import and application startup time against a budget.
+
+    python -m bench.startup --budget-ms 250
+
+Each run is a fresh interpreter that imports app.py and calls create_app(),
+so the figures include everything a worker or a ``flask`` command pays before
+it can do any work. Flask and SQLAlchemy are imported first and timed
+separately: their cost depends on the machine rather than on this code, so
+the budget covers only what the application adds on top. Exits non-zero when the median run is over budget or a
+module that is meant to load lazily (DEFERRED) was imported, which is how CI
+enforces both. Neither step may touch the database; a run against an
+unreachable server must cost the same as one against a live one.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 250
+
+# Loaded on first use only; see filters.py. Babel is no longer among them:
+# Flask-WTF, which the forms need for CSRF, imports it for its translations.
+DEFERRED = ("dateutil",)
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import flask, flask_sqlalchemy, sqlalchemy
+frameworks = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "frameworks_ms": (frameworks - started) * 1000,
+    "import_ms": (imported - frameworks) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "modules": sorted(name for name in sys.modules if "." not in name),
+}))
+"""
+
+
+def run_once(env):
+    output = subprocess.check_output([sys.executable, "-c", PROBE], env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, DATABASE_URL=args.database)
+    runs = [run_once(env) for _ in range(args.runs)]
+    frameworks_ms = statistics.median(run["frameworks_ms"] for run in runs)
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    create_ms = statistics.median(run["create_app_ms"] for run in runs)
+    total_ms = statistics.median(run["import_ms"] + run["create_app_ms"] for run in runs)
+
+    print(f"frameworks    {frameworks_ms:8.1f}ms  (not budgeted)")
+    print(f"import app    {import_ms:8.1f}ms")
+    print(f"create_app()  {create_ms:8.1f}ms")
+    print(f"total         {total_ms:8.1f}ms  (budget {args.budget_ms:.0f}ms)")
+    status = 0
+    loaded = [name for name in DEFERRED if name in runs[-1]["modules"]]
+    if loaded:
+        print(f"loaded at startup but meant to be deferred: {', '.join(loaded)}", file=sys.stderr)
+        status = 1
+    if total_ms > args.budget_ms:
+        print("over budget", file=sys.stderr)
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Compare buffered and streamed rendering of the list pages.
+
+    python -m bench.stream --scale small
+
+Requests /venues, /artists and a full page of /shows with STREAM_LIST_PAGES
+off and on, with the page cache disabled, and reports time to first byte,
+time to last byte and the peak Python memory allocated while serving one
+request (tracemalloc, measured in a separate pass so tracing does not skew
+the timings). Then checks, with the in-memory page cache on, that a second
+streamed request of each page is a cache hit with the same body.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+URLS = ("/venues", "/artists", "/shows?limit=200")
+
+
+def serve(client, url):
+    """(ms to first chunk, ms to last chunk, bytes) for one request."""
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks, b"")
+    first_byte = time.perf_counter()
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    last_byte = time.perf_counter()
+    response.close()
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {url} answered {response.status_code}")
+    return (first_byte - started) * 1000, (last_byte - started) * 1000, size
+
+
+def peak_memory(client, url):
+    tracemalloc.start()
+    try:
+        serve(client, url)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def cache_check(app, url):
+    """An error message if a repeated streamed GET of ``url`` missed the cache."""
+    from extensions import cache
+
+    client = app.test_client()
+    cache.backend.clear()
+    first = client.get(url).get_data()
+    hits = cache.hits
+    second = client.get(url).get_data()
+    if cache.hits != hits + 1:
+        return f"second GET {url} was not served from the cache"
+    if second != first:
+        return f"cached GET {url} differs from the streamed one"
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--scale", default="small", help="tiny, small, medium or large")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per page and mode.")
+    args = parser.parse_args(argv)
+
+    # config.py reads the environment at import time.
+    os.environ["DATABASE_URL"] = args.database
+    from app import create_app
+    from bench.seed import seed
+    from extensions import db
+    from models import Venue
+
+    clients = {}
+    for stream in (False, True):
+        app = create_app(CACHE_TYPE="null", STREAM_LIST_PAGES=stream)
+        clients[stream] = app.test_client()
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            seed(db, args.scale)
+
+    print(f"{'page':18} {'mode':9} {'ttfb p50':>10} {'total p50':>10} {'peak mem':>10} {'size':>9}")
+    for url in URLS:
+        for stream, client in clients.items():
+            serve(client, url)
+            timings = [serve(client, url) for _ in range(args.requests)]
+            ttfb = statistics.median(timing[0] for timing in timings)
+            total = statistics.median(timing[1] for timing in timings)
+            peak = peak_memory(client, url)
+            print(
+                f"{url:18} {'stream' if stream else 'buffered':9} {ttfb:8.2f}ms {total:8.2f}ms "
+                f"{peak / 1024:8.0f}kB {timings[-1][2] / 1024:7.0f}kB"
+            )
+
+    cached = create_app(CACHE_TYPE="lru", STREAM_LIST_PAGES=True)
+    failures = [failure for failure in (cache_check(cached, url) for url in URLS) if failure]
+    print(f"streamed pages cached: {'no' if failures else 'yes'}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Throughput of the production profile under gunicorn, one worker vs many.
+
+    python -m bench.workers --scale small --workers 1,4 --seconds 10
+
+Starts gunicorn with gunicorn.conf.py (preload, config_production) on a
+local port for each worker count and drives it from ``--threads`` client
+threads for ``--seconds``, with the page cache disabled. Most requests are
+the GET pages of bench.run; every ``--form-every``-th one is the CSRF round
+trip of a browser listing a venue: GET /venues/create for the form and its
+token, then POST it with the session cookie. Under load those two requests
+land on different workers, so a secret that differed between workers would
+show up as rejected submissions. Reports requests per second, latency
+percentiles and submissions accepted and rejected; the venues it lists are
+deleted at the end.
+"""
+import argparse
+import http.cookiejar
+import itertools
+import multiprocessing
+import os
+import re
+import secrets
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from bench.run import _percentile
+
+NAME_PREFIX = "Bench Workers Venue"
+TOKEN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+VENUE = {
+    "city": "Austin",
+    "state": "TX",
+    "address": "1 Bench Street",
+    "phone": "512-5555-0100",
+    "genres": "Jazz",
+    "image_link": "https://example.com/venue.png",
+    "facebook_link": "https://facebook.com/bench",
+    "website_link": "https://example.com",
+    "seeking_description": "",
+}
+
+
+def _serve(workers, port, env):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+        + ["--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).close()
+            return server
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"gunicorn did not start on port {port}")
+
+
+def _submit_venue(opener, base, number):
+    """True if the listing went through, False if the form was rejected."""
+    with opener.open(f"{base}/venues/create") as response:
+        token = TOKEN.search(response.read().decode()).group(1)
+    data = dict(VENUE, name=f"{NAME_PREFIX} {number}", csrf_token=token)
+    with opener.open(f"{base}/venues/create", urllib.parse.urlencode(data).encode()) as response:
+        return "was successfully listed" in response.read().decode()
+
+
+def drive(base, urls, threads, seconds, form_every):
+    latencies, outcomes, errors = [], [], []
+    numbers = itertools.count()
+    deadline = time.monotonic() + seconds
+
+    def client_thread(offset):
+        opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+        for step in itertools.count(offset):
+            if time.monotonic() > deadline:
+                return
+            started = time.perf_counter()
+            try:
+                if form_every and step % form_every == 0:
+                    outcomes.append(_submit_venue(opener, base, next(numbers)))
+                else:
+                    opener.open(base + urls[step % len(urls)]).close()
+            except urllib.error.URLError as error:
+                errors.append(str(error))
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    clients = [threading.Thread(target=client_thread, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    return len(latencies) / (time.perf_counter() - started), latencies, outcomes, errors
+
+
+def main(argv=None):
+    default_workers = multiprocessing.cpu_count() * 2 + 1
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--scale", default="small", help="tiny, small, medium or large")
+    parser.add_argument("--workers", default=f"1,{default_workers}", help="Comma-separated counts.")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent client threads.")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of each run.")
+    parser.add_argument("--form-every", type=int, default=10, help="0 for GET pages only.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    # config.py reads the environment at import time.
+    os.environ["DATABASE_URL"] = args.database
+    from app import create_app
+    from bench.run import _routes
+    from bench.seed import seed
+    from extensions import db
+    from models import Venue
+
+    app = create_app(CACHE_TYPE="null")
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            seed(db, args.scale)
+    urls = [url for _, method, url, _ in _routes(app, db) if method == "GET"]
+
+    env = dict(
+        os.environ,
+        SECRET_KEY=secrets.token_hex(32),
+        SESSION_COOKIE_SECURE="0",
+        CACHE_TYPE="null",
+    )
+    print(f"{args.threads} client threads, {args.seconds:.0f}s per run, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'req/s':>8} {'p50':>9} {'p99':>9} {'forms ok':>9} {'rejected':>9}")
+    status = 0
+    try:
+        for workers in (int(count) for count in args.workers.split(",")):
+            server = _serve(workers, args.port, env)
+            try:
+                base = f"http://127.0.0.1:{args.port}"
+                throughput, latencies, outcomes, errors = drive(
+                    base, urls, args.threads, args.seconds, args.form_every
+                )
+            finally:
+                server.terminate()
+                server.wait()
+            rejected = outcomes.count(False)
+            print(
+                f"{workers:7} {throughput:8.1f} {statistics.median(latencies):7.1f}ms "
+                f"{_percentile(latencies, 99):7.1f}ms {outcomes.count(True):9} {rejected:9}"
+            )
+            if errors:
+                print(f"  {len(errors)} failed requests, e.g. {errors[0]}", file=sys.stderr)
+            if rejected or errors:
+                status = 1
+    finally:
+        with app.app_context():
+            db.session.execute(db.delete(Venue).where(Venue.name.startswith(NAME_PREFIX)))
+            db.session.commit()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
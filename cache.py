@@ -0,0 +1,269 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from types import GeneratorType
+from urllib.parse import quote, unquote
+
+from flask import current_app, g, session
+
+
+# ----------------------------------------------------------------------------#
+# Backends.
+#
+# A backend stores opaque values under string keys with a TTL and evicts the
+# least recently used entry once it holds max_entries. LRUBackend lives in the
+# worker process; FileSystemBackend is shared by every worker on the host.
+# ----------------------------------------------------------------------------#
+class LRUBackend:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileSystemBackend:
+    def __init__(self, directory, max_entries=512):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, quote(key, safe=""))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires < time.time():
+            self.delete(key)
+            return None
+        # mtime doubles as the last-used time for eviction. Another worker
+        # may have evicted or invalidated the entry since it was read.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump((time.time() + ttl, value), f)
+            os.replace(tmp, path)
+        except OSError:
+            # Not stored; the next request renders the page again.
+            self._remove(tmp)
+            return
+        self._evict()
+
+    def _entries(self):
+        """The stored entries, without other writers' in-flight temporary files."""
+        try:
+            return [
+                entry for entry in os.scandir(self.directory) if not entry.name.endswith(".tmp")
+            ]
+        except OSError:
+            return []
+
+    def _evict(self):
+        entries = self._entries()
+        if len(entries) <= self.max_entries:
+            return
+        used = {}
+        for entry in entries:
+            try:
+                used[entry.path] = entry.stat().st_mtime
+            except OSError:
+                pass  # Removed by another worker meanwhile.
+        for path in sorted(used, key=used.get)[: len(used) - self.max_entries]:
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def delete_prefix(self, prefix):
+        for entry in self._entries():
+            if unquote(entry.name).startswith(prefix):
+                self._remove(entry.path)
+
+    def clear(self):
+        self.delete_prefix("")
+
+
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def clear(self):
+        pass
+
+
+# ----------------------------------------------------------------------------#
+# Rendered-page cache.
+# ----------------------------------------------------------------------------#
+def _versioned(key):
+    # @conditional sets g.page_etag from the versions of the page's tables.
+    if g.get("page_etag"):
+        return f"{key}@{g.page_etag}"
+    return key
+
+
+class ResponseCache:
+    """Caches the HTML of read-only pages until a write invalidates them.
+
+    Configured by CACHE_TYPE ("lru", "filesystem" or "null"),
+    CACHE_DEFAULT_TTL, CACHE_MAX_ENTRIES and CACHE_DIR. Hit and miss counters
+    are per process.
+    """
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.default_ttl = 60
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = app.config.get("CACHE_TYPE", "lru")
+        max_entries = app.config.get("CACHE_MAX_ENTRIES", 512)
+        if cache_type == "lru":
+            self.backend = LRUBackend(max_entries)
+        elif cache_type == "filesystem":
+            self.backend = FileSystemBackend(app.config["CACHE_DIR"], max_entries)
+        elif cache_type == "null":
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f"Unknown CACHE_TYPE {cache_type!r}")
+        self.default_ttl = app.config.get("CACHE_DEFAULT_TTL", 60)
+        app.extensions["response_cache"] = self
+
+    def cached(self, key_func, ttl=None):
+        """Serve the view from the cache under ``key_func(**view_args)``.
+
+        Only plain string bodies are stored, so error pages and redirects are
+        never cached. A streamed page is stored once it has been sent in
+        full. Requests with pending flash messages bypass the cache in both
+        directions, as the rendered page would contain them.
+
+        Under @conditional the key also carries the page's ETag, so a page
+        whose data changed is a miss in every worker, including after writes
+        made elsewhere (``flask counters``, another host) whose invalidate
+        calls only reached their own process's cache.
+        """
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                if "_flashes" in session:
+                    return view(**kwargs)
+                key = _versioned(key_func(**kwargs))
+                body = self.backend.get(key)
+                if body is not None:
+                    self.hits += 1
+                    return body
+                self.misses += 1
+                body = view(**kwargs)
+                if isinstance(body, GeneratorType):
+                    # What stream_template returns; wrapped so it can be teed below.
+                    body = current_app.response_class(body)
+                if isinstance(body, str):
+                    self.backend.set(key, body, ttl or self.default_ttl)
+                elif getattr(body, "is_streamed", False) and body.status_code == 200:
+                    if not isinstance(self.backend, NullBackend):
+                        body.response = self._tee(key, body.response, ttl or self.default_ttl)
+                return body
+
+            return wrapper
+
+        return decorator
+
+    def _tee(self, key, chunks, ttl):
+        # A client that disconnects early closes the generator before the
+        # set, so a partial page is never stored.
+        body = []
+        for chunk in chunks:
+            body.append(chunk)
+            yield chunk
+        self.backend.set(key, "".join(body), ttl)
+
+    def get_or_set(self, key, compute, ttl=None):
+        """Cached value under ``key``, calling ``compute()`` to fill a miss.
+
+        For query results that several pages share; they are dropped by the
+        same invalidate calls as pages. Under @conditional the key carries the
+        page's ETag as in ``cached``, so every worker recomputes them once the
+        data behind the page changed.
+        """
+        key = _versioned(key)
+        value = self.backend.get(key)
+        if value is None:
+            value = compute()
+            self.backend.set(key, value, ttl or self.default_ttl)
+        return value
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self.backend.delete(key)
+            self.backend.delete_prefix(f"{key}@")
+
+    def invalidate_prefix(self, prefix):
+        self.backend.delete_prefix(prefix)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
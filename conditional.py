@@ -0,0 +1,51 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import g, make_response, request, session
+
+
+def conditional(version_func):
+    """Answer conditional GETs for a view from a cheap version lookup.
+
+    ``version_func(**view_args)`` returns ``(last_modified, token)`` for the
+    data the page renders, or None when it does not exist (the view then
+    runs and 404s as usual). The ETag is a hash of the token, so a client
+    that is current gets a 304 without the view or template running. It is
+    left in ``g.page_etag`` for the page cache to key the page and the
+    query results it shares by, also when pending flashes skip the 304.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            version = version_func(**kwargs)
+            if version is None:
+                return view(**kwargs)
+
+            last_modified, token = version
+            last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+            etag = g.page_etag = hashlib.sha1(repr(token).encode()).hexdigest()
+            if "_flashes" in session:
+                # The page shows them, so it is neither a 304 nor validated;
+                # the ETag still keys what the view caches.
+                return view(**kwargs)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = (
+                    request.if_modified_since is not None
+                    and last_modified <= request.if_modified_since
+                )
+
+            response = make_response("" if not_modified else view(**kwargs))
+            if not_modified:
+                response.status_code = 304
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
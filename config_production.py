@@ -0,0 +1,26 @@
+"""Settings for running under gunicorn with several workers.
+
+Everything in config.py applies, except as changed below. gunicorn.conf.py
+builds the application with ``create_app("config_production")``.
+"""
+import os
+
+from config import *  # noqa: F401,F403
+
+DEBUG = False
+
+# Workers are separate processes: a session cookie, flash or CSRF token
+# signed by one has to verify in all of them, so the key cannot be random.
+SECRET_KEY = os.environ.get("SECRET_KEY")
+if not SECRET_KEY:
+    raise RuntimeError("Set SECRET_KEY to the same value for every worker and host.")
+SESSION_COOKIE_SECURE = os.environ.get("SESSION_COOKIE_SECURE", "1") == "1"
+SESSION_COOKIE_SAMESITE = "Lax"
+
+# The per-worker LRU cache would be invalidated only in the worker that
+# served a write; the filesystem one is shared by the workers on a host.
+CACHE_TYPE = os.environ.get("CACHE_TYPE", "filesystem")
+
+# The gunicorn master builds the app before forking (preload_app), so the
+# warmed templates are shared by every worker.
+TEMPLATE_WARMUP = os.environ.get("TEMPLATE_WARMUP", "1") == "1"
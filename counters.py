@@ -0,0 +1,194 @@
+"""Upcoming/past show counters on Venue and Artist.
+
+Each venue and artist carries ``upcoming_shows_count``, ``past_shows_count``
+and ``next_show_at``, the earliest show counted as upcoming. Show inserts,
+deletes and updates adjust them in the same transaction (the mapper events
+below run on the flush's own connection). Time passing moves shows from
+upcoming to past without any write, so ``flask counters roll`` recounts the
+venues and artists whose ``next_show_at`` has gone by; run it every minute
+or so. ``flask counters rebuild`` recounts everything, for repair and after
+loads that bypass the ORM.
+
+A show is counted as upcoming when it starts at or after ``next_show_at``.
+Between rolls that can disagree with the clock for an owner whose next show
+has just passed; the next roll recounts exactly those owners.
+"""
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, case, event, func, inspect, or_, select, update
+
+from extensions import cache, db
+from models import Venue, Artist, Show
+from versions import bump_versions
+
+counters_cli = AppGroup("counters", help="Maintain the show counters on venues and artists.")
+
+OWNERS = ((Venue, Show.venue_id, "venue_id"), (Artist, Show.artist_id, "artist_id"))
+
+
+# ----------------------------------------------------------------------------#
+# Incremental updates.
+# ----------------------------------------------------------------------------#
+def _values(target):
+    return {name: getattr(target, name) for name in ("start_time", "venue_id", "artist_id")}
+
+
+def _count_show(connection, show):
+    start_time = show["start_time"]
+    upcoming = start_time > datetime.now()
+    for model, owner_column, key in OWNERS:
+        if show[key] is None:
+            continue
+        if upcoming:
+            sooner = or_(model.next_show_at.is_(None), model.next_show_at > start_time)
+            values = {
+                "upcoming_shows_count": model.upcoming_shows_count + 1,
+                "next_show_at": case((sooner, start_time), else_=model.next_show_at),
+            }
+        else:
+            values = {"past_shows_count": model.past_shows_count + 1}
+        connection.execute(update(model).where(model.id == show[key]).values(**values))
+
+
+def _uncount_show(connection, show):
+    start_time = show["start_time"]
+    for model, owner_column, key in OWNERS:
+        if show[key] is None:
+            continue
+        counted_upcoming = and_(model.next_show_at.is_not(None), model.next_show_at <= start_time)
+        next_show_at = (
+            select(func.min(Show.start_time))
+            .where(owner_column == model.id, Show.start_time >= model.next_show_at)
+            .scalar_subquery()
+        )
+        connection.execute(
+            update(model)
+            .where(model.id == show[key])
+            .values(
+                upcoming_shows_count=model.upcoming_shows_count
+                - case((counted_upcoming, 1), else_=0),
+                past_shows_count=model.past_shows_count - case((counted_upcoming, 0), else_=1),
+                next_show_at=case(
+                    (model.next_show_at == start_time, next_show_at), else_=model.next_show_at
+                ),
+            )
+        )
+
+
+@event.listens_for(Show, "after_insert")
+def _after_insert(mapper, connection, target):
+    _count_show(connection, _values(target))
+
+
+@event.listens_for(Show, "after_delete")
+def _after_delete(mapper, connection, target):
+    # The row is already gone, so a deleted next show is replaced correctly.
+    _uncount_show(connection, _values(target))
+
+
+def _load_previous(target, value, oldvalue, initiator):
+    pass
+
+
+# With active_history the old value is loaded before it is replaced, even on
+# an expired instance, so after_update can always tell what to uncount.
+for _attribute in (Show.start_time, Show.venue_id, Show.artist_id):
+    event.listen(_attribute, "set", _load_previous, active_history=True)
+
+
+@event.listens_for(Show, "after_update")
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    after = _values(target)
+    before = dict(after)
+    for name in after:
+        history = state.attrs[name].load_history()
+        if history.deleted:
+            before[name] = history.deleted[0]
+    if before != after:
+        _uncount_show(connection, before)
+        _count_show(connection, after)
+
+
+# ----------------------------------------------------------------------------#
+# Recounting.
+# ----------------------------------------------------------------------------#
+def _recount(model, owner_column, now):
+    owned = owner_column == model.id
+    return {
+        "upcoming_shows_count": select(func.count(Show.id))
+        .where(owned, Show.start_time > now)
+        .scalar_subquery(),
+        "past_shows_count": select(func.count(Show.id))
+        .where(owned, Show.start_time <= now)
+        .scalar_subquery(),
+        "next_show_at": select(func.min(Show.start_time))
+        .where(owned, Show.start_time > now)
+        .scalar_subquery(),
+    }
+
+
+def roll_counters(now=None):
+    """Recount the venues and artists whose next show has started.
+
+    Returns the number of venues and artists updated; the caller commits.
+    """
+    now = now or datetime.now()
+    rolled = 0
+    for model, owner_column, _ in OWNERS:
+        result = db.session.execute(
+            update(model)
+            .where(model.next_show_at <= now)
+            .values(**_recount(model, owner_column, now)),
+            execution_options={"synchronize_session": False},
+        )
+        if result.rowcount:
+            bump_versions(db.session.connection(), model.__tablename__)
+        rolled += result.rowcount
+    return rolled
+
+
+def rebuild_counters(venue_ids=None, artist_ids=None):
+    """Recount every venue and artist, or only the given ids.
+
+    Returns the number of venues and artists updated; the caller commits.
+    """
+    now = datetime.now()
+    rebuilt = 0
+    for (model, owner_column, _), ids in zip(OWNERS, (venue_ids, artist_ids)):
+        query = update(model).values(**_recount(model, owner_column, now))
+        if venue_ids is not None or artist_ids is not None:
+            if not ids:
+                continue
+            query = query.where(model.id.in_(ids))
+        result = db.session.execute(query, execution_options={"synchronize_session": False})
+        if result.rowcount:
+            bump_versions(db.session.connection(), model.__tablename__)
+        rebuilt += result.rowcount
+    return rebuilt
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+@counters_cli.command("roll")
+def roll_command():
+    """Move shows that have started from upcoming to past."""
+    rolled = roll_counters()
+    db.session.commit()
+    # This only reaches a shared (filesystem) cache. The workers' in-memory
+    # caches key pages by their version, which the recount has changed.
+    if rolled:
+        cache.invalidate_prefix("venues:")
+    click.echo(f"{rolled} venues and artists rolled.")
+
+
+@counters_cli.command("rebuild")
+def rebuild_command():
+    """Recount every venue's and artist's shows from scratch."""
+    rebuilt = rebuild_counters()
+    db.session.commit()
+    cache.invalidate_prefix("venues:")
+    click.echo(f"{rebuilt} venues and artists recounted.")
@@ -0,0 +1,27 @@
+from flask import Blueprint, abort, current_app, jsonify
+
+from extensions import cache, db
+
+debug = Blueprint("debug", __name__, url_prefix="/debug")
+
+
+@debug.before_request
+def require_debug_endpoints():
+    if not current_app.config["DEBUG_ENDPOINTS"]:
+        abort(404)
+
+
+@debug.route("/pool")
+def pool():
+    """Connection pool counters for this worker process."""
+    pool = db.engine.pool
+    stats = {"status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return jsonify(stats)
+
+
+@debug.route("/cache")
+def cache_stats():
+    return jsonify(cache.stats())
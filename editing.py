@@ -0,0 +1,51 @@
+"""Saving the edit forms of venues and artists.
+
+Only the columns the form edits are loaded, and only the ones whose
+submitted value differs are set, so the UPDATE names just those. Venue and
+Artist map ``version`` as their version_id_col: every ORM UPDATE adds
+``WHERE version = <the version the form was rendered from>`` and bumps it.
+A form rendered before someone else saved the row therefore matches no row,
+and SQLAlchemy raises StaleDataError instead of overwriting their changes.
+The counters maintained by counters.py are written with Core UPDATEs and
+leave the version alone, so a new show does not fail an edit.
+"""
+from flask import abort
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.attributes import set_committed_value
+
+from extensions import db
+
+NOT_EDITABLE = {"csrf_token", "version"}
+
+
+def editable(form):
+    """Names of the form's fields that are columns of the row it edits."""
+    return [field.name for field in form if field.name not in NOT_EDITABLE]
+
+
+def load_for_edit(model, id, form):
+    """The ``model`` with ``id``, with only the columns ``form`` needs; 404 if missing."""
+    columns = [getattr(model, name) for name in editable(form)]
+    obj = db.session.get(model, id, options=[load_only(*columns, model.version)])
+    if obj is None:
+        abort(404)
+    return obj
+
+
+def _same(current, submitted):
+    # An empty field and a NULL column are the same value.
+    return (current or None) == (submitted or None)
+
+
+def save_edit(obj, form):
+    """Write what ``form`` changed on ``obj`` and commit; returns the changed names.
+
+    Raises StaleDataError when the row is no longer at the form's version.
+    Nothing is written, and nothing checked, when nothing changed.
+    """
+    set_committed_value(obj, "version", form.version.data)
+    changed = [name for name in editable(form) if not _same(getattr(obj, name), form[name].data)]
+    for name in changed:
+        setattr(obj, name, form[name].data)
+    db.session.commit()
+    return changed
@@ -0,0 +1,119 @@
+import csv
+import json
+from datetime import date, datetime
+
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context
+from sqlalchemy import select
+
+from extensions import db
+from models import Venue, Artist, Show
+from routing import read_only
+
+export = Blueprint("export", __name__, url_prefix="/export")
+
+MODELS = {"venues": Venue, "artists": Artist, "shows": Show}
+
+
+# ----------------------------------------------------------------------------#
+# Row source.
+# ----------------------------------------------------------------------------#
+def _parse_datetime(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, f"{name} must be an ISO 8601 datetime")
+
+
+def _filters(model):
+    """Time-range filters from the query string.
+
+    ``updated_since`` applies to every table, for incremental pulls;
+    ``start`` / ``end`` bound Show.start_time (start inclusive, end exclusive).
+    """
+    filters = []
+    updated_since = _parse_datetime("updated_since")
+    if updated_since is not None:
+        filters.append(model.updated_at >= updated_since)
+    if model is Show:
+        start, end = _parse_datetime("start"), _parse_datetime("end")
+        if start is not None:
+            filters.append(Show.start_time >= start)
+        if end is not None:
+            filters.append(Show.start_time < end)
+    return filters
+
+
+def _rows(model, filters):
+    # yield_per streams from a server-side cursor in fixed-size batches, so
+    # memory stays flat however many rows match.
+    query = (
+        select(*model.__table__.columns)
+        .where(*filters)
+        .order_by(model.id)
+        .execution_options(yield_per=current_app.config["EXPORT_BATCH_SIZE"])
+    )
+    yield from db.session.execute(query).mappings()
+
+
+# ----------------------------------------------------------------------------#
+# Encoders.
+# ----------------------------------------------------------------------------#
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _ndjson(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(row), default=_json_default) + "\n"
+
+
+class _Line:
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ";".join(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv(columns, rows):
+    # csv.writer returns whatever the file's write() returns, which here is
+    # the formatted line itself.
+    writer = csv.writer(_Line())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row.values()])
+
+
+FORMATS = {
+    "ndjson": (_ndjson, "application/x-ndjson"),
+    "csv": (_csv, "text/csv"),
+}
+
+
+# ----------------------------------------------------------------------------#
+# Endpoints.
+# ----------------------------------------------------------------------------#
+@export.route("/<table>.<format>")
+@read_only
+def export_table(table, format):
+    if table not in MODELS or format not in FORMATS:
+        abort(404)
+    model = MODELS[table]
+    encode, mimetype = FORMATS[format]
+    rows = _rows(model, _filters(model))
+    columns = [column.key for column in model.__table__.columns]
+    return Response(
+        stream_with_context(encode(columns, rows)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={table}.{format}"},
+    )
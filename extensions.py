@@ -0,0 +1,25 @@
+"""Extension instances, bound to an application by ``create_app``.
+
+Modules import these instead of importing from app.py, so models, queries
+and blueprints can be imported without building an application or touching
+the database. Flask-Migrate is not among them: it imports Alembic, and is
+set up by ``create_app`` only for the ``flask`` command line.
+"""
+from flask_moment import Moment
+from flask_sqlalchemy import SQLAlchemy
+
+from assets import Assets
+from async_reads import AsyncReads
+from autocomplete import Autocomplete
+from cache import ResponseCache
+from instrumentation import Instrumentation
+from routing import ReplicaRouter, RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+moment = Moment()
+assets = Assets()
+cache = ResponseCache()
+instrumentation = Instrumentation()
+router = ReplicaRouter()
+async_reads = AsyncReads()
+autocomplete = Autocomplete()
@@ -0,0 +1,64 @@
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app, g
+
+FORMATS = {
+    "full": "EEEE MMMM, d, y 'at' h:mma",
+    "medium": "EE MM, dd, y h:mma",
+}
+
+
+# ----------------------------------------------------------------------------#
+# Compiled pattern, locale and timezone lookups. These are keyed by a handful
+# of distinct values, so the caches stay tiny. Babel and dateutil are imported
+# on first use; together they are a large share of the application's import
+# time and most processes (CLI commands, workers before their first page)
+# never format a date.
+# ----------------------------------------------------------------------------#
+@lru_cache(maxsize=64)
+def _pattern(format):
+    from babel.dates import parse_pattern
+
+    return parse_pattern(FORMATS.get(format, format))
+
+
+@lru_cache(maxsize=64)
+def _locale(identifier):
+    from babel.core import Locale
+
+    return Locale.parse(identifier)
+
+
+@lru_cache(maxsize=64)
+def _timezone(name):
+    from babel.dates import get_timezone
+
+    return get_timezone(name) if name else None
+
+
+@lru_cache(maxsize=4096)
+def _format(value, format, locale, timezone):
+    from babel.dates import DateTimeFormat
+
+    tzinfo = _timezone(timezone)
+    if tzinfo is not None:
+        # Naive values are stored in server local time.
+        value = value.astimezone(tzinfo)
+    return _pattern(format) % DateTimeFormat(value, _locale(locale))
+
+
+def format_datetime(value, format="medium"):
+    """Jinja ``datetime`` filter.
+
+    Takes a datetime (or, for older callers, a string to parse) and formats
+    it in the request's locale and timezone, falling back to the configured
+    defaults. Results are memoized in a bounded LRU keyed on all four inputs.
+    """
+    if not isinstance(value, datetime):
+        import dateutil.parser
+
+        value = dateutil.parser.parse(value)
+    locale = g.get("locale") or current_app.config["DATETIME_LOCALE"]
+    timezone = g.get("timezone") or current_app.config["DATETIME_TIMEZONE"]
+    return _format(value, format, locale, timezone)
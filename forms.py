@@ -1,81 +1,155 @@
-from datetime import datetime
-from flask_wtf import Form
+from datetime import datetime, timedelta
+from flask_wtf import FlaskForm
 from wtforms import (
     StringField,
     SelectField,
     SelectMultipleField,
     DateTimeField,
     BooleanField,
+    IntegerField,
 )
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms.widgets import HiddenInput
+from wtforms.validators import DataRequired, AnyOf, URL, Optional, ValidationError
 from wtforms.validators import Regexp
+from werkzeug.exceptions import BadRequest
 
+# The vocabulary for the form choices and for the genre/state filters and
+# facets on /venues and /artists.
+STATES = [
+    "AL",
+    "AK",
+    "AZ",
+    "AR",
+    "CA",
+    "CO",
+    "CT",
+    "DE",
+    "DC",
+    "FL",
+    "GA",
+    "HI",
+    "ID",
+    "IL",
+    "IN",
+    "IA",
+    "KS",
+    "KY",
+    "LA",
+    "ME",
+    "MT",
+    "NE",
+    "NV",
+    "NH",
+    "NJ",
+    "NM",
+    "NY",
+    "NC",
+    "ND",
+    "OH",
+    "OK",
+    "OR",
+    "MD",
+    "MA",
+    "MI",
+    "MN",
+    "MS",
+    "MO",
+    "PA",
+    "RI",
+    "SC",
+    "SD",
+    "TN",
+    "TX",
+    "UT",
+    "VT",
+    "VA",
+    "WA",
+    "WV",
+    "WI",
+    "WY",
+]
+GENRES = [
+    "Alternative",
+    "Blues",
+    "Classical",
+    "Country",
+    "Electronic",
+    "Folk",
+    "Funk",
+    "Hip-Hop",
+    "Heavy Metal",
+    "Instrumental",
+    "Jazz",
+    "Musical Theatre",
+    "Pop",
+    "Punk",
+    "R&B",
+    "Reggae",
+    "Rock n Roll",
+    "Soul",
+    "Other",
+]
 
-class ShowForm(Form):
-    artist_id = StringField("artist_id")
-    venue_id = StringField("venue_id")
-    start_time = DateTimeField("start_time", validators=[DataRequired()], default=datetime.today())
 
+def list_filters(args):
+    """The ?genre= and ?state= filters of a list page, as (genre, state).
 
-class VenueForm(Form):
+    Missing or empty values are None; anything outside the vocabulary is a
+    400, which also keeps junk out of the page cache keys.
+    """
+    genre = args.get("genre") or None
+    state = args.get("state") or None
+    if (genre and genre not in GENRES) or (state and state not in STATES):
+        raise BadRequest()
+    return genre, state
+
+
+def calendar_range(args, default_days, max_days):
+    """The ?start=&end= range of a calendar request, as datetimes.
+
+    Both are ISO 8601 dates or datetimes. ``start`` defaults to today and
+    ``end`` to ``default_days`` after it; an unparsable or reversed range, or
+    one longer than ``max_days``, is a 400.
+    """
+    try:
+        start = datetime.fromisoformat(args["start"]) if args.get("start") else None
+        end = datetime.fromisoformat(args["end"]) if args.get("end") else None
+    except ValueError:
+        raise BadRequest("start and end must be ISO 8601 dates or datetimes")
+    start = start or datetime.combine(datetime.today(), datetime.min.time())
+    end = end or start + timedelta(days=default_days)
+    if not start < end <= start + timedelta(days=max_days):
+        raise BadRequest(f"end must be after start and at most {max_days} days later")
+    return start, end
+
+
+DATETIME_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"]
+
+
+class ShowForm(FlaskForm):
+    artist_id = IntegerField("artist_id", validators=[DataRequired()])
+    venue_id = IntegerField("venue_id", validators=[DataRequired()])
+    start_time = DateTimeField(
+        "start_time",
+        validators=[DataRequired()],
+        default=datetime.today(),
+        format=DATETIME_FORMATS,
+    )
+    # Empty means the default show length (models.DEFAULT_SHOW_DURATION).
+    end_time = DateTimeField("end_time", validators=[Optional()], format=DATETIME_FORMATS)
+
+    def validate_end_time(self, field):
+        if self.start_time.data and field.data <= self.start_time.data:
+            raise ValidationError("The show has to end after it starts.")
+
+
+class VenueForm(FlaskForm):
     name = StringField("name", validators=[DataRequired()])
     city = StringField("city", validators=[DataRequired()])
     state = SelectField(
         "state",
         validators=[DataRequired()],
-        choices=[
-            ("AL", "AL"),
-            ("AK", "AK"),
-            ("AZ", "AZ"),
-            ("AR", "AR"),
-            ("CA", "CA"),
-            ("CO", "CO"),
-            ("CT", "CT"),
-            ("DE", "DE"),
-            ("DC", "DC"),
-            ("FL", "FL"),
-            ("GA", "GA"),
-            ("HI", "HI"),
-            ("ID", "ID"),
-            ("IL", "IL"),
-            ("IN", "IN"),
-            ("IA", "IA"),
-            ("KS", "KS"),
-            ("KY", "KY"),
-            ("LA", "LA"),
-            ("ME", "ME"),
-            ("MT", "MT"),
-            ("NE", "NE"),
-            ("NV", "NV"),
-            ("NH", "NH"),
-            ("NJ", "NJ"),
-            ("NM", "NM"),
-            ("NY", "NY"),
-            ("NC", "NC"),
-            ("ND", "ND"),
-            ("OH", "OH"),
-            ("OK", "OK"),
-            ("OR", "OR"),
-            ("MD", "MD"),
-            ("MA", "MA"),
-            ("MI", "MI"),
-            ("MN", "MN"),
-            ("MS", "MS"),
-            ("MO", "MO"),
-            ("PA", "PA"),
-            ("RI", "RI"),
-            ("SC", "SC"),
-            ("SD", "SD"),
-            ("TN", "TN"),
-            ("TX", "TX"),
-            ("UT", "UT"),
-            ("VT", "VT"),
-            ("VA", "VA"),
-            ("WA", "WA"),
-            ("WV", "WV"),
-            ("WI", "WI"),
-            ("WY", "WY"),
-        ],
+        choices=[(state, state) for state in STATES],
     )
     address = StringField("address", validators=[DataRequired()])
     phone = StringField(
@@ -93,27 +167,7 @@ class VenueForm(Form):
         # TODO implement enum restriction
         "genres",
         validators=[DataRequired()],
-        choices=[
-            ("Alternative", "Alternative"),
-            ("Blues", "Blues"),
-            ("Classical", "Classical"),
-            ("Country", "Country"),
-            ("Electronic", "Electronic"),
-            ("Folk", "Folk"),
-            ("Funk", "Funk"),
-            ("Hip-Hop", "Hip-Hop"),
-            ("Heavy Metal", "Heavy Metal"),
-            ("Instrumental", "Instrumental"),
-            ("Jazz", "Jazz"),
-            ("Musical Theatre", "Musical Theatre"),
-            ("Pop", "Pop"),
-            ("Punk", "Punk"),
-            ("R&B", "R&B"),
-            ("Reggae", "Reggae"),
-            ("Rock n Roll", "Rock n Roll"),
-            ("Soul", "Soul"),
-            ("Other", "Other"),
-        ],
+        choices=[(genre, genre) for genre in GENRES],
     )
     facebook_link = StringField("facebook_link", validators=[URL()])
     website_link = StringField("website_link", validators=[URL()])
@@ -122,65 +176,13 @@ class VenueForm(Form):
     seeking_description = StringField("seeking_description")
 
 
-class ArtistForm(Form):
+class ArtistForm(FlaskForm):
     name = StringField("name", validators=[DataRequired()])
     city = StringField("city", validators=[DataRequired()])
     state = SelectField(
         "state",
         validators=[DataRequired()],
-        choices=[
-            ("AL", "AL"),
-            ("AK", "AK"),
-            ("AZ", "AZ"),
-            ("AR", "AR"),
-            ("CA", "CA"),
-            ("CO", "CO"),
-            ("CT", "CT"),
-            ("DE", "DE"),
-            ("DC", "DC"),
-            ("FL", "FL"),
-            ("GA", "GA"),
-            ("HI", "HI"),
-            ("ID", "ID"),
-            ("IL", "IL"),
-            ("IN", "IN"),
-            ("IA", "IA"),
-            ("KS", "KS"),
-            ("KY", "KY"),
-            ("LA", "LA"),
-            ("ME", "ME"),
-            ("MT", "MT"),
-            ("NE", "NE"),
-            ("NV", "NV"),
-            ("NH", "NH"),
-            ("NJ", "NJ"),
-            ("NM", "NM"),
-            ("NY", "NY"),
-            ("NC", "NC"),
-            ("ND", "ND"),
-            ("OH", "OH"),
-            ("OK", "OK"),
-            ("OR", "OR"),
-            ("MD", "MD"),
-            ("MA", "MA"),
-            ("MI", "MI"),
-            ("MN", "MN"),
-            ("MS", "MS"),
-            ("MO", "MO"),
-            ("PA", "PA"),
-            ("RI", "RI"),
-            ("SC", "SC"),
-            ("SD", "SD"),
-            ("TN", "TN"),
-            ("TX", "TX"),
-            ("UT", "UT"),
-            ("VT", "VT"),
-            ("VA", "VA"),
-            ("WA", "WA"),
-            ("WV", "WV"),
-            ("WI", "WI"),
-            ("WY", "WY"),
-        ],
+        choices=[(state, state) for state in STATES],
     )
     phone = StringField(
         "phone",
@@ -196,27 +198,7 @@ class ArtistForm(Form):
     genres = SelectMultipleField(
         "genres",
         validators=[DataRequired()],
-        choices=[
-            ("Alternative", "Alternative"),
-            ("Blues", "Blues"),
-            ("Classical", "Classical"),
-            ("Country", "Country"),
-            ("Electronic", "Electronic"),
-            ("Folk", "Folk"),
-            ("Funk", "Funk"),
-            ("Hip-Hop", "Hip-Hop"),
-            ("Heavy Metal", "Heavy Metal"),
-            ("Instrumental", "Instrumental"),
-            ("Jazz", "Jazz"),
-            ("Musical Theatre", "Musical Theatre"),
-            ("Pop", "Pop"),
-            ("Punk", "Punk"),
-            ("R&B", "R&B"),
-            ("Reggae", "Reggae"),
-            ("Rock n Roll", "Rock n Roll"),
-            ("Soul", "Soul"),
-            ("Other", "Other"),
-        ],
+        choices=[(genre, genre) for genre in GENRES],
     )
     facebook_link = StringField(
         "facebook_link",
@@ -228,3 +210,13 @@ class ArtistForm(Form):
     seeking_venue = BooleanField("seeking_venue")
 
     seeking_description = StringField("seeking_description")
+
+
+# The edit forms carry the version of the row they were rendered from, so
+# saving one that someone else has saved since is refused; see editing.py.
+class EditVenueForm(VenueForm):
+    version = IntegerField("version", widget=HiddenInput(), validators=[DataRequired()])
+
+
+class EditArtistForm(ArtistForm):
+    version = IntegerField("version", widget=HiddenInput(), validators=[DataRequired()])
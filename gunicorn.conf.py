@@ -0,0 +1,38 @@
+"""gunicorn settings for production: ``gunicorn -c gunicorn.conf.py``.
+
+The master imports and builds the application once (preload_app) and forks
+the workers from it, so they start warm and share its memory pages. The
+SQLAlchemy engines built in the master are disposed of in each child
+before first use: a pooled connection copied across a fork would be used
+by two processes at once.
+"""
+import multiprocessing
+import os
+
+wsgi_app = "app:create_app('config_production')"
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+preload_app = True
+
+# One process per core and then some, to cover the time workers spend
+# waiting on the database. Each has its own connection pool of
+# DB_POOL_SIZE + DB_MAX_OVERFLOW, which the database has to allow for.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# Recycled after this many requests (spread by the jitter so they do not all
+# restart together); 0 keeps workers for good.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    from extensions import db
+
+    with server.app.wsgi().app_context():
+        for engine in db.engines.values():
+            # close=False: the connections belong to the master; only drop
+            # this process's references to them.
+            engine.dispose(close=False)
@@ -0,0 +1,330 @@
+import csv
+import io
+import json
+import os
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+from itertools import islice
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+from wtforms import BooleanField, DateTimeField, SelectMultipleField
+
+from counters import rebuild_counters
+from extensions import db
+from forms import ArtistForm, ShowForm, VenueForm
+from models import DEFAULT_SHOW_DURATION, Venue, Artist, Show
+from queries import booked_shows
+from versions import bump_versions
+
+import_cli = AppGroup("import", help="Bulk import venues, artists and shows from CSV or NDJSON.")
+
+TABLES = {"venues": (Venue, VenueForm), "artists": (Artist, ArtistForm), "shows": (Show, ShowForm)}
+FALSE_VALUES = {"", "0", "f", "false", "n", "no", "off"}
+
+
+# ----------------------------------------------------------------------------#
+# Reading and validation.
+# ----------------------------------------------------------------------------#
+def _read(path, format):
+    with open(path, newline="") as f:
+        if format == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _formdata(fields, row):
+    """Turn a CSV/NDJSON row into the form data a browser would have posted.
+
+    Multi-valued fields may be lists (NDJSON) or ';'-separated strings (CSV,
+    as written by /export); boolean fields are omitted when falsy, like an
+    unticked checkbox; ISO 8601 datetimes are accepted as well.
+    """
+    formdata = MultiDict()
+    for name, value in row.items():
+        field = fields.get(name)
+        if field is None or value is None:
+            continue
+        if isinstance(field, SelectMultipleField):
+            values = value if isinstance(value, list) else str(value).split(";")
+            for item in values:
+                if item:
+                    formdata.add(name, item)
+        elif isinstance(field, BooleanField):
+            if value is True or str(value).strip().lower() not in FALSE_VALUES:
+                formdata.add(name, "y")
+        elif isinstance(field, DateTimeField):
+            try:
+                value = datetime.fromisoformat(value).strftime(field.format[0])
+            except (TypeError, ValueError):
+                pass
+            formdata.add(name, str(value))
+        else:
+            formdata.add(name, str(value))
+    return formdata
+
+
+def _validate(form_class, fields, row):
+    # Rows come from a file, not a browser session: no CSRF token to check.
+    form = form_class(_formdata(fields, row), meta={"csrf": False})
+    if not form.validate():
+        return None, form.errors
+    values = form.data
+    if form_class is ShowForm:
+        values["end_time"] = values["end_time"] or values["start_time"] + DEFAULT_SHOW_DURATION
+    return values, None
+
+
+def _owner_errors(checked):
+    """Errors per row number for shows whose venue or artist does not exist.
+
+    One query per table for the whole chunk, so a bad id is reported with
+    its row instead of failing the chunk's INSERT on the foreign key.
+    """
+    errors = {}
+    for name, owner in (("venue", Venue), ("artist", Artist)):
+        ids = {values[f"{name}_id"] for _, values in checked}
+        found = set(db.session.scalars(select(owner.id).where(owner.id.in_(ids))))
+        for number, values in checked:
+            if values[f"{name}_id"] not in found:
+                errors.setdefault(number, {})[f"{name}_id"] = [
+                    f"There is no {name} {values[f'{name}_id']}."
+                ]
+    return errors
+
+
+def _overlapping(timeline, start, end):
+    # The shows in a timeline never overlap each other, so the only one
+    # that can overlap [start, end) is the last to start before ``end``.
+    position = bisect_left(timeline, (end,))
+    if position and timeline[position - 1][1] > start:
+        return timeline[position - 1][2]
+    return None
+
+
+def _booking_errors(checked, booked):
+    """Errors per row number for shows that overlap another of their venue or artist.
+
+    ``checked`` is a chunk's (number, values). They are compared with the
+    shows in the database, all fetched by one query, with each other and
+    with ``booked``: per (owner, id), the (start, end, whose) of earlier rows
+    not written yet. Rows that pass are added to it.
+    """
+    if not checked:
+        return {}
+    shows = booked_shows(
+        {values["venue_id"] for _, values in checked},
+        {values["artist_id"] for _, values in checked},
+        min(values["start_time"] for _, values in checked),
+        max(values["end_time"] for _, values in checked),
+    )
+    timelines = {
+        (name, values[f"{name}_id"]): list(booked.get((name, values[f"{name}_id"]), ()))
+        for _, values in checked
+        for name in ("venue", "artist")
+    }
+    for show in shows:
+        for name in ("venue", "artist"):
+            timeline = timelines.get((name, getattr(show, f"{name}_id")))
+            if timeline is not None:
+                timeline.append((show.start_time, show.end_time, f"for show {show.id}"))
+    for timeline in timelines.values():
+        timeline.sort()
+
+    errors = {}
+    for number, values in checked:
+        start, end = values["start_time"], values["end_time"]
+        keys = [(name, values[f"{name}_id"]) for name in ("venue", "artist")]
+        for name, id in keys:
+            whose = _overlapping(timelines[name, id], start, end)
+            if whose is not None:
+                errors.setdefault(number, {})[f"{name}_id"] = [
+                    f"The {name} is already booked then, {whose}."
+                ]
+        if number in errors:
+            continue
+        for key in keys:
+            interval = (start, end, f"by row {number}")
+            insort(timelines[key], interval)
+            booked.setdefault(key, []).append(interval)
+    return errors
+
+
+# ----------------------------------------------------------------------------#
+# Writers.
+# ----------------------------------------------------------------------------#
+def _insert_many(model, rows):
+    db.session.execute(insert(model), rows)
+
+
+def _pg_literal(value):
+    if isinstance(value, list):
+        items = ('"' + item.replace("\\", "\\\\").replace('"', '\\"') + '"' for item in value)
+        return "{" + ",".join(items) + "}"
+    return value
+
+
+def _column_defaults(model, columns):
+    """Values for the other columns' Python-side defaults, which COPY skips."""
+    defaults = {}
+    for column in model.__table__.columns:
+        default = column.default
+        if column.name in columns or default is None:
+            continue
+        # Callables get no execution context, so only argument-free ones work.
+        defaults[column.name] = default.arg if default.is_scalar else default.arg(None)
+    return defaults
+
+
+def _copy(model, rows):
+    """COPY the rows in through the session's own connection and transaction."""
+    defaults = _column_defaults(model, rows[0])
+    rows = [{**row, **defaults} for row in rows]
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_pg_literal(row[column]) for column in columns])
+    buffer.seek(0)
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        f'COPY "{model.__tablename__}" ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer
+    )
+
+
+def _writer(use_copy):
+    if not use_copy:
+        return _insert_many
+    connection = db.session.connection().connection
+    if db.engine.dialect.name != "postgresql" or not hasattr(connection.cursor(), "copy_expert"):
+        click.echo("COPY needs Postgres through psycopg2; using executemany instead.")
+        return _insert_many
+    return _copy
+
+
+# ----------------------------------------------------------------------------#
+# Checkpoints.
+# ----------------------------------------------------------------------------#
+def _load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)["rows"]
+    except FileNotFoundError:
+        return 0
+
+
+def _save_checkpoint(path, rows):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"rows": rows}, f)
+    os.replace(tmp, path)
+
+
+# ----------------------------------------------------------------------------#
+# Command.
+# ----------------------------------------------------------------------------#
+def _import(table, path, format, chunk_size, dry_run, use_copy, restart):
+    model, form_class = TABLES[table]
+    format = format or ("csv" if path.endswith(".csv") else "ndjson")
+    checkpoint = path + ".checkpoint"
+    if restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    done = 0 if dry_run else _load_checkpoint(checkpoint)
+    if done:
+        click.echo(f"Resuming after row {done} from {checkpoint}")
+
+    write = None if dry_run else _writer(use_copy)
+    fields = form_class(meta={"csrf": False})._fields
+    rows = enumerate(_read(path, format), start=1)
+    imported = invalid = 0
+    started = time.perf_counter()
+    for _ in islice(rows, done):
+        pass
+
+    # Shows of rows not in the database yet: the current chunk's, or with
+    # --dry-run every earlier row's.
+    booked = {}
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        if not dry_run:
+            booked.clear()
+        checked, errors = [], {}
+        for number, row in chunk:
+            values, errors[number] = _validate(form_class, fields, row)
+            if values is not None:
+                checked.append((number, values))
+        if model is Show:
+            errors.update(_owner_errors(checked))
+            checked = [(number, values) for number, values in checked if not errors[number]]
+            errors.update(_booking_errors(checked, booked))
+        for number, row_errors in errors.items():
+            if row_errors:
+                invalid += 1
+                click.echo(f"row {number}: {row_errors}", err=True)
+        valid = [values for number, values in checked if not errors[number]]
+        if valid and not dry_run:
+            try:
+                write(model, valid)
+            except IntegrityError as e:
+                db.session.rollback()
+                rows = f"Rows {chunk[0][0]}-{chunk[-1][0]}"
+                if "_booking" in str(e.orig):
+                    # Booked by someone else since the check above.
+                    raise click.ClickException(
+                        f"{rows} overlap a show booked during the import; none of them "
+                        f"were written. Run the command again to resume."
+                    )
+                raise click.ClickException(
+                    f"{rows} could not be written, none of them: {e.orig}. Run the command "
+                    f"again to resume once the data is fixed."
+                )
+            bump_versions(db.session.connection(), model.__tablename__)
+            if model is Show:
+                # Bulk inserts skip the ORM events that maintain the counters.
+                rebuild_counters(
+                    venue_ids={row["venue_id"] for row in valid},
+                    artist_ids={row["artist_id"] for row in valid},
+                )
+            db.session.commit()
+        if not dry_run:
+            _save_checkpoint(checkpoint, chunk[-1][0])
+        imported += len(valid)
+        elapsed = time.perf_counter() - started
+        click.echo(f"{chunk[-1][0]} rows read, {imported} valid, {imported / elapsed:,.0f} rows/s")
+
+    elapsed = time.perf_counter() - started
+    verb = "validated" if dry_run else "imported"
+    click.echo(
+        f"{imported} {table} {verb}, {invalid} invalid, "
+        f"in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:,.0f} rows/s)"
+    )
+    if not dry_run and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+
+def _command(table):
+    @import_cli.command(table, help=f"Import {table} from a CSV or NDJSON file.")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", type=click.Choice(["csv", "ndjson"]), help="Default: by extension.")
+    @click.option("--chunk-size", default=5000, show_default=True, help="Rows per transaction.")
+    @click.option("--dry-run", is_flag=True, help="Validate only; write nothing.")
+    @click.option("--copy", "use_copy", is_flag=True, help="Load with Postgres COPY.")
+    @click.option("--restart", is_flag=True, help="Ignore an existing checkpoint.")
+    def command(path, format, chunk_size, dry_run, use_copy, restart):
+        _import(table, path, format, chunk_size, dry_run, use_copy, restart)
+
+    return command
+
+
+for _table in TABLES:
+    _command(_table)
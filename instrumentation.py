@@ -0,0 +1,177 @@
+import json
+import logging
+import time
+from collections import Counter
+
+from flask import (
+    before_render_template,
+    current_app,
+    g,
+    has_request_context,
+    request,
+    template_rendered,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.template = 0.0
+        self._template_started = None
+        self.statements = []
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def repeated(self, threshold):
+        """Statements whose shape ran more than ``threshold`` times (likely N+1)."""
+        counts = Counter(statement for statement, _ in self.statements)
+        return [
+            {"count": count, "sql": statement}
+            for statement, count in counts.most_common()
+            if count > threshold
+        ]
+
+
+class Instrumentation:
+    """Per-request query, template and handler timings.
+
+    Every response carries a Server-Timing header with db, tpl, app and
+    total durations, except streamed ones: their body renders after the
+    headers are sent, so the header only has the time until then, and their
+    full timings go to the logs below once the body has been sent.
+    Requests slower than SLOW_REQUEST_MS are logged as one JSON line with
+    their SQL to the "app.slow" logger (and to SLOW_REQUEST_LOG when set). A statement that repeats more than
+    N_PLUS_ONE_THRESHOLD times in one request is logged as a likely N+1.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SLOW_REQUEST_MS", 500)
+        app.config.setdefault("N_PLUS_ONE_THRESHOLD", 10)
+        app.config.setdefault("SLOW_REQUEST_LOG", None)
+        self.logger = app.logger.getChild("slow")
+        self.logger.setLevel(logging.INFO)
+        if app.config["SLOW_REQUEST_LOG"]:
+            handler = logging.FileHandler(app.config["SLOW_REQUEST_LOG"])
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.logger.addHandler(handler)
+
+        # Engine-wide listeners outlive the application; add them only once
+        # when several applications are built in one process.
+        if not event.contains(Engine, "before_cursor_execute", self._before_execute):
+            event.listen(Engine, "before_cursor_execute", self._before_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.extensions["instrumentation"] = self
+
+    # SQL.
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        timings = g.get("timings") if has_request_context() else None
+        if timings is not None:
+            timings.db += elapsed
+            timings.statements.append((statement, elapsed))
+
+    # Templates.
+    def _before_render(self, sender, template, context, **extra):
+        timings = g.get("timings")
+        if timings is not None:
+            timings._template_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        timings = g.get("timings")
+        if timings is not None and timings._template_started is not None:
+            timings.template += time.perf_counter() - timings._template_started
+            timings._template_started = None
+
+    # Requests.
+    def _before_request(self):
+        g.timings = RequestTimings()
+
+    def _after_request(self, response):
+        if response.is_streamed:
+            # The body is rendered, and its queries run, only as it is sent,
+            # after the headers: log its timings once it has been sent.
+            timings = g.get("timings")
+            if timings is None:
+                return response
+            until_streaming = f'app;dur={timings.total * 1000:.1f};desc="until streaming"'
+            response.headers["Server-Timing"] = until_streaming
+            request_info = self._request_info(response)
+            response.call_on_close(lambda: self._log(timings, request_info))
+            return response
+
+        timings = g.pop("timings", None)
+        if timings is None:
+            return response
+        total = timings.total
+        handler = total - timings.db - timings.template
+        response.headers["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={timings.db * 1000:.1f};desc="{len(timings.statements)} queries"',
+                f"tpl;dur={timings.template * 1000:.1f}",
+                f"app;dur={handler * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ]
+        )
+        self._log(timings, self._request_info(response))
+        return response
+
+    @staticmethod
+    def _request_info(response):
+        # Taken while the request context is still there, which it no longer
+        # is when a streamed response is closed.
+        return (
+            {
+                "method": request.method,
+                "path": request.full_path.rstrip("?"),
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+            },
+            current_app.config["SLOW_REQUEST_MS"],
+            current_app.config["N_PLUS_ONE_THRESHOLD"],
+        )
+
+    def _log(self, timings, request_info):
+        info, slow_request_ms, n_plus_one_threshold = request_info
+        total = timings.total
+        repeated = timings.repeated(n_plus_one_threshold)
+        for item in repeated:
+            self.logger.warning(
+                "N+1 suspected on %s %s: %d x %s",
+                info["method"],
+                info["path"],
+                item["count"],
+                item["sql"],
+            )
+        if total * 1000 >= slow_request_ms:
+            self.logger.info(
+                json.dumps(
+                    {
+                        **info,
+                        "total_ms": round(total * 1000, 1),
+                        "db_ms": round(timings.db * 1000, 1),
+                        "template_ms": round(timings.template * 1000, 1),
+                        "queries": len(timings.statements),
+                        "statements": [
+                            {"sql": statement, "ms": round(elapsed * 1000, 1)}
+                            for statement, elapsed in timings.statements
+                        ],
+                        "repeated": repeated,
+                    }
+                )
+            )
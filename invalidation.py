@@ -0,0 +1,49 @@
+from extensions import cache, db
+from models import Show
+
+
+# ----------------------------------------------------------------------------#
+# Cache invalidation. A write drops the cached pages that render the changed
+# row: its own page, the list pages and facet counts, the pages of everything
+# it has shows with, and every cached page of /shows. List pages are cached
+# per filter, under "venues:<genre>:<state>".
+# ----------------------------------------------------------------------------#
+def invalidate_venue_lists():
+    cache.invalidate_prefix("venues:")
+    cache.invalidate_prefix("facets:venues:")
+
+
+def invalidate_artist_lists():
+    cache.invalidate_prefix("artists:")
+    cache.invalidate_prefix("facets:artists:")
+
+
+def invalidate_venue(venue_id, artist_ids):
+    invalidate_venue_lists()
+    cache.invalidate(f"venue:{venue_id}", *(f"artist:{id}" for id in artist_ids))
+    cache.invalidate_prefix("shows:")
+
+
+def invalidate_artist(artist_id, venue_ids):
+    invalidate_artist_lists()
+    cache.invalidate(f"artist:{artist_id}", *(f"venue:{id}" for id in venue_ids))
+    cache.invalidate_prefix("shows:")
+
+
+def invalidate_show(venue_id, artist_id):
+    # The venue list shows upcoming show counts; the artist list does not.
+    cache.invalidate_prefix("venues:")
+    cache.invalidate(f"venue:{venue_id}", f"artist:{artist_id}")
+    cache.invalidate_prefix("shows:")
+
+
+def show_artist_ids(venue_id):
+    return db.session.scalars(
+        db.select(Show.artist_id).where(Show.venue_id == venue_id).distinct()
+    ).all()
+
+
+def show_venue_ids(artist_id):
+    return db.session.scalars(
+        db.select(Show.venue_id).where(Show.artist_id == artist_id).distinct()
+    ).all()
@@ -0,0 +1,65 @@
+"""search indexes
+
+Revision ID: 3c9f6e2b7a41
+Revises: be8b9922eb43
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3c9f6e2b7a41"
+down_revision = "be8b9922eb43"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # array_to_string() is only STABLE, so the document is wrapped in an
+    # IMMUTABLE function that both the indexes and search.py call.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION fyyur_search_document(
+            name varchar, city varchar, state varchar, genres varchar[]
+        ) RETURNS tsvector
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT to_tsvector(
+                'simple',
+                coalesce(name, '') || ' ' || coalesce(city, '') || ' ' ||
+                coalesce(state, '') || ' ' || coalesce(array_to_string(genres, ' '), '')
+            )
+        $$
+        """
+    )
+    for table in ("Venue", "Artist"):
+        op.create_index(
+            f"ix_{table}_name_trgm",
+            table,
+            ["name"],
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        )
+        op.create_index(
+            f"ix_{table}_search_document",
+            table,
+            [sa.text("fyyur_search_document(name, city, state, genres)")],
+            postgresql_using="gin",
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for table in ("Venue", "Artist"):
+        op.drop_index(f"ix_{table}_search_document", table_name=table)
+        op.drop_index(f"ix_{table}_name_trgm", table_name=table)
+    op.execute(
+        "DROP FUNCTION IF EXISTS fyyur_search_document(varchar, varchar, varchar, varchar[])"
+    )
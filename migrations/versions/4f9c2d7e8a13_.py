@@ -0,0 +1,134 @@
+"""show end times and booking constraints
+
+Revision ID: 4f9c2d7e8a13
+Revises: ba3f07d6e114
+Create Date: 2026-10-18 15:12:44.031962
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4f9c2d7e8a13"
+down_revision = "ba3f07d6e114"
+branch_labels = None
+depends_on = None
+
+OWNERS = ("venue_id", "artist_id")
+
+# Existing shows get three hours, cut short where their venue or artist has
+# its next show sooner, so only shows booked at the very same time clash.
+BACKFILL = {
+    "postgresql": """
+        UPDATE "Show" SET end_time = least(
+            start_time + interval '3 hours',
+            (SELECT min(later.start_time) FROM "Show" later
+             WHERE later.venue_id = "Show".venue_id AND later.start_time > "Show".start_time),
+            (SELECT min(later.start_time) FROM "Show" later
+             WHERE later.artist_id = "Show".artist_id AND later.start_time > "Show".start_time)
+        )
+    """,
+    # SQLite keeps datetimes as text; carry the fractional seconds over so
+    # the values still sort like the ones the application writes. Its min()
+    # is NULL if any argument is, hence the far-future stand-in.
+    "sqlite": """
+        UPDATE "Show" SET end_time = min(
+            datetime(start_time, '+3 hours') || substr(start_time, 20),
+            coalesce(
+                (SELECT min(later.start_time) FROM "Show" later
+                 WHERE later.venue_id = "Show".venue_id AND later.start_time > "Show".start_time),
+                '9999-12-31'
+            ),
+            coalesce(
+                (SELECT min(later.start_time) FROM "Show" later
+                 WHERE later.artist_id = "Show".artist_id AND later.start_time > "Show".start_time),
+                '9999-12-31'
+            )
+        )
+    """,
+}
+
+SQLITE_TRIGGER = """
+    CREATE TRIGGER "tr_Show_{owner}_booking_{name}"
+    BEFORE {operation} ON "Show"
+    WHEN (
+        SELECT end_time FROM "Show"
+        WHERE {owner} = NEW.{owner} AND start_time < NEW.end_time {other_rows}
+        ORDER BY start_time DESC LIMIT 1
+    ) > NEW.start_time
+    BEGIN
+        SELECT RAISE(ABORT, 'ex_Show_{owner}_booking: conflicting booking');
+    END
+"""
+
+
+def _sqlite_triggers(owner):
+    yield "insert", "INSERT", ""
+    yield "update", f"UPDATE OF {owner}, start_time, end_time", "AND id != NEW.id"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    # Checked before any change, as SQLite cannot roll back the DDL below.
+    same_start = sa.text(
+        """
+        SELECT id, venue_id, artist_id, start_time FROM "Show"
+        WHERE EXISTS (
+            SELECT 1 FROM "Show" other
+            WHERE other.id != "Show".id AND other.start_time = "Show".start_time
+            AND (other.venue_id = "Show".venue_id OR other.artist_id = "Show".artist_id)
+        )
+        ORDER BY start_time, id
+        """
+    )
+    clashes = op.get_bind().execute(same_start).all()
+    if clashes:
+        listed = "\n".join(
+            f"  show {id}: venue {venue_id}, artist {artist_id} at {start_time}"
+            for id, venue_id, artist_id, start_time in clashes[:20]
+        )
+        raise RuntimeError(
+            f"{len(clashes)} shows start at the same time as another show of their venue "
+            f"or artist; move or delete them and run the upgrade again:\n{listed}"
+        )
+
+    with op.batch_alter_table("Show", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("end_time", sa.DateTime(), nullable=True))
+    op.execute(BACKFILL["postgresql" if dialect == "postgresql" else "sqlite"])
+
+    with op.batch_alter_table("Show", schema=None) as batch_op:
+        batch_op.alter_column("end_time", existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_check_constraint("ck_Show_end_time", "end_time > start_time")
+
+    if dialect == "postgresql":
+        # Builds a GiST index per constraint under an exclusive lock on Show.
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        for owner in OWNERS:
+            op.execute(
+                f'ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{owner}_booking" '
+                f"EXCLUDE USING gist ({owner} WITH =, tsrange(start_time, end_time) WITH &&)"
+            )
+    elif dialect == "sqlite":
+        for owner in OWNERS:
+            for name, operation, other_rows in _sqlite_triggers(owner):
+                op.execute(
+                    SQLITE_TRIGGER.format(
+                        owner=owner, name=name, operation=operation, other_rows=other_rows
+                    )
+                )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        for owner in OWNERS:
+            op.execute(f'ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_{owner}_booking"')
+    elif dialect == "sqlite":
+        for owner in OWNERS:
+            for name, _, _ in _sqlite_triggers(owner):
+                op.execute(f'DROP TRIGGER "tr_Show_{owner}_booking_{name}"')
+
+    with op.batch_alter_table("Show", schema=None) as batch_op:
+        batch_op.drop_constraint("ck_Show_end_time", type_="check")
+        batch_op.drop_column("end_time")
@@ -0,0 +1,35 @@
+"""updated_at columns
+
+Revision ID: 8d41b0c5e2f7
+Revises: 3c9f6e2b7a41
+Create Date: 2026-10-18 10:03:27.540913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8d41b0c5e2f7"
+down_revision = "3c9f6e2b7a41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ("Venue", "Artist", "Show"):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column(
+                    "updated_at",
+                    sa.DateTime(),
+                    nullable=False,
+                    server_default=sa.func.now(),
+                )
+            )
+
+
+def downgrade():
+    for table in ("Show", "Artist", "Venue"):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column("updated_at")
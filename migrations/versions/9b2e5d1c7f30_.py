@@ -0,0 +1,32 @@
+"""venue and artist versions
+
+Revision ID: 9b2e5d1c7f30
+Revises: 4f9c2d7e8a13
+Create Date: 2026-10-18 17:36:20.418377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9b2e5d1c7f30"
+down_revision = "4f9c2d7e8a13"
+branch_labels = None
+depends_on = None
+
+OWNERS = ("Venue", "Artist")
+
+
+def upgrade():
+    for table in OWNERS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+            )
+
+
+def downgrade():
+    for table in OWNERS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column("version")
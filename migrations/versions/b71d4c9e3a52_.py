@@ -0,0 +1,45 @@
+"""show indexes
+
+Revision ID: b71d4c9e3a52
+Revises: 8d41b0c5e2f7
+Create Date: 2026-10-18 11:20:52.306718
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "b71d4c9e3a52"
+down_revision = "8d41b0c5e2f7"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Venue and artist pages: a venue's/artist's shows split at now().
+    ("ix_Show_venue_id_start_time", ["venue_id", "start_time"]),
+    ("ix_Show_artist_id_start_time", ["artist_id", "start_time"]),
+    # /shows: keyset pagination orders by (start_time, id).
+    ("ix_Show_start_time_id", ["start_time", "id"]),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY does not lock out writes but cannot run
+        # inside a transaction.
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                op.create_index(name, "Show", columns, postgresql_concurrently=True)
+    else:
+        for name, columns in INDEXES:
+            op.create_index(name, "Show", columns)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, _ in INDEXES:
+                op.drop_index(name, table_name="Show", postgresql_concurrently=True)
+    else:
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="Show")
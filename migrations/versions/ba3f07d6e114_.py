@@ -0,0 +1,47 @@
+"""genre and state filter indexes
+
+Revision ID: ba3f07d6e114
+Revises: e2a8f5c61d90
+Create Date: 2026-10-18 14:02:31.577190
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "ba3f07d6e114"
+down_revision = "e2a8f5c61d90"
+branch_labels = None
+depends_on = None
+
+TABLES = ("Venue", "Artist")
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        # Built without blocking writes, as in b71d4c9e3a52. The GIN index
+        # serves genres @> ARRAY[...] containment filters.
+        with op.get_context().autocommit_block():
+            for table in TABLES:
+                op.create_index(
+                    f"ix_{table}_genres",
+                    table,
+                    ["genres"],
+                    postgresql_using="gin",
+                    postgresql_concurrently=True,
+                )
+                op.create_index(f"ix_{table}_state", table, ["state"], postgresql_concurrently=True)
+    else:
+        for table in TABLES:
+            op.create_index(f"ix_{table}_state", table, ["state"])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for table in TABLES:
+                op.drop_index(f"ix_{table}_state", table_name=table, postgresql_concurrently=True)
+                op.drop_index(f"ix_{table}_genres", table_name=table, postgresql_concurrently=True)
+    else:
+        for table in TABLES:
+            op.drop_index(f"ix_{table}_state", table_name=table)
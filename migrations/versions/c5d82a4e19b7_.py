@@ -0,0 +1,37 @@
+"""table versions
+
+Revision ID: c5d82a4e19b7
+Revises: 9b2e5d1c7f30
+Create Date: 2026-10-18 19:04:51.276310
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c5d82a4e19b7"
+down_revision = "9b2e5d1c7f30"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table = op.create_table(
+        "TableVersion",
+        sa.Column("name", sa.String(length=32), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(
+        table,
+        [{"name": name, "version": 0, "updated_at": now} for name in ("Venue", "Artist", "Show")],
+    )
+
+
+def downgrade():
+    op.drop_table("TableVersion")
@@ -0,0 +1,65 @@
+"""show counters
+
+Revision ID: e2a8f5c61d90
+Revises: b71d4c9e3a52
+Create Date: 2026-10-18 12:41:09.884512
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e2a8f5c61d90"
+down_revision = "b71d4c9e3a52"
+branch_labels = None
+depends_on = None
+
+OWNERS = (("Venue", "venue_id"), ("Artist", "artist_id"))
+
+
+def upgrade():
+    for table, _ in OWNERS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column("upcoming_shows_count", sa.Integer(), nullable=False, server_default="0")
+            )
+            batch_op.add_column(
+                sa.Column("past_shows_count", sa.Integer(), nullable=False, server_default="0")
+            )
+            batch_op.add_column(sa.Column("next_show_at", sa.DateTime(), nullable=True))
+            batch_op.create_index(f"ix_{table}_next_show_at", ["next_show_at"], unique=False)
+
+    # Shows are stored in server local time, which is what the app compares
+    # them against; the database's own clock may be UTC.
+    for table, owner in OWNERS:
+        op.execute(
+            sa.text(
+                f"""
+                UPDATE "{table}" SET
+                    upcoming_shows_count = (
+                        SELECT count(*) FROM "Show"
+                        WHERE "Show".{owner} = "{table}".id AND "Show".start_time > :now
+                    ),
+                    past_shows_count = (
+                        SELECT count(*) FROM "Show"
+                        WHERE "Show".{owner} = "{table}".id AND "Show".start_time <= :now
+                    ),
+                    next_show_at = (
+                        SELECT min("Show".start_time) FROM "Show"
+                        WHERE "Show".{owner} = "{table}".id AND "Show".start_time > :now
+                    )
+                """
+            ).bindparams(now=datetime.now())
+        )
+
+
+def downgrade():
+    for table, _ in OWNERS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f"ix_{table}_next_show_at")
+            batch_op.drop_column("next_show_at")
+            batch_op.drop_column("past_shows_count")
+            batch_op.drop_column("upcoming_shows_count")
@@ -1,4 +1,13 @@
-from app import db
+from datetime import datetime, timedelta
+
+from sqlalchemy import DDL, event, func
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+
+from extensions import db
+
+# Length of a show created without an end time.
+DEFAULT_SHOW_DURATION = timedelta(hours=3)
+
 
 class Venue(db.Model):
     __tablename__ = "Venue"
@@ -14,10 +23,24 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.Text)
     website_link = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genres = db.Column(db.ARRAY(db.String).with_variant(db.JSON, "sqlite"), nullable=False)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    # Maintained by counters.py.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    next_show_at = db.Column(db.DateTime, index=True)
+
+    # Bumped by every ORM update; see editing.py. No server_default here (the
+    # migration has one): SQLAlchemy would take the version for server-made
+    # and fetch it with RETURNING, whose rowcount SQLite cannot vouch for.
+    version = db.Column(db.Integer, nullable=False, default=1)
 
     shows = db.relationship("Show", backref="Venue", lazy=True)
 
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<Venue {self.id} {self.name}>"
 
@@ -32,25 +55,170 @@ class Artist(db.Model):
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genres = db.Column(db.ARRAY(db.String).with_variant(db.JSON, "sqlite"), nullable=False)
     website_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.Text)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    # Maintained by counters.py.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    next_show_at = db.Column(db.DateTime, index=True)
+
+    # Bumped by every ORM update; see editing.py. No server_default here (the
+    # migration has one): SQLAlchemy would take the version for server-made
+    # and fetch it with RETURNING, whose rowcount SQLite cannot vouch for.
+    version = db.Column(db.Integer, nullable=False, default=1)
 
     shows = db.relationship("Show", backref="Artist", lazy=True)
 
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<Artist {self.id} {self.name}>"
 
 
 class Show(db.Model):
     __tablename__ = "Show"
+    __table_args__ = (
+        db.Index("ix_Show_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_Show_artist_id_start_time", "artist_id", "start_time"),
+        db.Index("ix_Show_start_time_id", "start_time", "id"),
+        db.CheckConstraint("end_time > start_time", name="ck_Show_end_time"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id"), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id"), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=lambda context: context.get_current_parameters()["start_time"]
+        + DEFAULT_SHOW_DURATION,
+    )
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
 
     def __repr__(self):
         return f"<Show {self.id} {self.start_time} aritst {self.artist_id} venue {self.venue_id}>"
 
+
+class TableVersion(db.Model):
+    """A counter per table, bumped by every write to it; see versions.py."""
+
+    __tablename__ = "TableVersion"
+
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+VERSIONED_TABLES = ("Venue", "Artist", "Show")
+
+
+@event.listens_for(TableVersion.__table__, "after_create")
+def _insert_table_versions(table, connection, **kw):
+    now = datetime.utcnow()
+    connection.execute(
+        table.insert(),
+        [{"name": name, "version": 0, "updated_at": now} for name in VERSIONED_TABLES],
+    )
+
+
+# ----------------------------------------------------------------------------#
+# Postgres search objects (migration 3c9f6e2b7a41) and the genre/state filter
+# indexes (ba3f07d6e114), declared here as well so that ``flask init-db``
+# builds the same schema as the migrations do.
+# ----------------------------------------------------------------------------#
+event.listen(
+    db.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+event.listen(
+    db.metadata,
+    "before_create",
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION fyyur_search_document(
+            name varchar, city varchar, state varchar, genres varchar[]
+        ) RETURNS tsvector
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT to_tsvector(
+                'simple',
+                coalesce(name, '') || ' ' || coalesce(city, '') || ' ' ||
+                coalesce(state, '') || ' ' || coalesce(array_to_string(genres, ' '), '')
+            )
+        $$
+        """
+    ).execute_if(dialect="postgresql"),
+)
+
+for model in (Venue, Artist):
+    db.Index(f"ix_{model.__tablename__}_genres", model.genres, postgresql_using="gin").ddl_if(
+        dialect="postgresql"
+    )
+    db.Index(f"ix_{model.__tablename__}_state", model.state)
+    db.Index(
+        f"ix_{model.__tablename__}_name_trgm",
+        model.name,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+    db.Index(
+        f"ix_{model.__tablename__}_search_document",
+        func.fyyur_search_document(model.name, model.city, model.state, model.genres),
+        postgresql_using="gin",
+    ).ddl_if(dialect="postgresql")
+
+
+# ----------------------------------------------------------------------------#
+# Bookings (migration 4f9c2d7e8a13). A venue or an artist cannot have two
+# shows at once. Postgres enforces it with GiST exclusion constraints; SQLite
+# with triggers that find the one show that could overlap with a single
+# index seek on (owner, start_time): as no two shows of an owner overlap, it
+# is the latest one starting before the new show ends.
+# ----------------------------------------------------------------------------#
+event.listen(
+    db.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+
+BOOKING_OWNERS = ("venue_id", "artist_id")
+
+for owner in BOOKING_OWNERS:
+    Show.__table__.append_constraint(
+        ExcludeConstraint(
+            (Show.__table__.c[owner], "="),
+            (func.tsrange(Show.__table__.c.start_time, Show.__table__.c.end_time), "&&"),
+            using="gist",
+            name=f"ex_Show_{owner}_booking",
+        ).ddl_if(dialect="postgresql")
+    )
+    for operation, other_rows in (
+        ("INSERT", ""),
+        (f"UPDATE OF {owner}, start_time, end_time", "AND id != NEW.id"),
+    ):
+        event.listen(
+            Show.__table__,
+            "after_create",
+            DDL(
+                f"""
+                CREATE TRIGGER "tr_Show_{owner}_booking_{operation.split()[0].lower()}"
+                BEFORE {operation} ON "Show"
+                WHEN (
+                    SELECT end_time FROM "Show"
+                    WHERE {owner} = NEW.{owner} AND start_time < NEW.end_time {other_rows}
+                    ORDER BY start_time DESC LIMIT 1
+                ) > NEW.start_time
+                BEGIN
+                    SELECT RAISE(ABORT, 'ex_Show_{owner}_booking: conflicting booking');
+                END
+                """
+            ).execute_if(dialect="sqlite"),
+        )
@@ -0,0 +1,471 @@
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import groupby
+
+from flask import current_app
+
+from sqlalchemy import ARRAY, String, case, cast, event, exists, func, literal, select, true
+from sqlalchemy import tuple_, union_all
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.engine import Engine
+
+from extensions import db
+from forms import GENRES, STATES
+from models import Venue, Artist, Show, TableVersion
+
+
+# ----------------------------------------------------------------------------#
+# Query counting.
+# ----------------------------------------------------------------------------#
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """Count every statement sent to the database inside the block."""
+    counter = QueryCounter()
+    event.listen(Engine, "before_cursor_execute", counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "before_cursor_execute", counter._on_execute)
+
+
+# ----------------------------------------------------------------------------#
+# Streaming.
+# ----------------------------------------------------------------------------#
+def fetch(query, stream=False):
+    """The rows of ``query``, all at once or, with ``stream``, as they are read.
+
+    A streamed result reads from a server-side cursor STREAM_BATCH_SIZE rows
+    at a time and can be iterated once; the connection stays checked out
+    until it is exhausted or the session closes.
+    """
+    if stream:
+        query = query.execution_options(yield_per=current_app.config["STREAM_BATCH_SIZE"])
+        return db.session.execute(query)
+    return db.session.execute(query).all()
+
+
+# ----------------------------------------------------------------------------#
+# Genre and state filters.
+#
+# On Postgres genres is a varchar[] and a genre filter is array containment,
+# which the GIN index on genres serves; on SQLite it is a JSON list.
+# ----------------------------------------------------------------------------#
+def _is_postgres():
+    return db.session.get_bind().dialect.name == "postgresql"
+
+
+def _genre_values(model):
+    """One row per genre of each ``model`` row, to join against."""
+    if _is_postgres():
+        return func.unnest(model.genres).table_valued("value").render_derived()
+    return func.json_each(model.genres).table_valued("value")
+
+
+def facet_filters(model, genre=None, state=None):
+    filters = []
+    if genre:
+        if _is_postgres():
+            # The column is the generic ARRAY, which has no contains(); @> is
+            # what the GIN index on genres serves.
+            filters.append(model.genres.op("@>")(cast(array([genre]), ARRAY(String))))
+        else:
+            values = func.json_each(model.genres).table_valued("value")
+            filters.append(exists().select_from(values).where(values.c.value == genre))
+    if state:
+        filters.append(model.state == state)
+    return filters
+
+
+def facet_counts(model, genre=None, state=None):
+    """Rows per genre and per state, in one query.
+
+    Each facet is counted with the other facet's filter applied but not its
+    own, so the counts say how many rows picking that value would show.
+    Values outside the GENRES/STATES vocabulary are left out.
+    """
+    values = _genre_values(model)
+    by_genre = (
+        select(literal("genre").label("facet"), values.c.value, func.count())
+        .select_from(model)
+        .join(values, true())
+        .where(*facet_filters(model, state=state))
+        .group_by(values.c.value)
+    )
+    by_state = (
+        select(literal("state").label("facet"), model.state, func.count())
+        .where(*facet_filters(model, genre=genre))
+        .group_by(model.state)
+    )
+    counts = {"genre": {}, "state": {}}
+    for facet, value, count in db.session.execute(union_all(by_genre, by_state)):
+        counts[facet][value] = count
+    return {
+        "genres": [(name, counts["genre"][name]) for name in GENRES if name in counts["genre"]],
+        "states": [(name, counts["state"][name]) for name in STATES if name in counts["state"]],
+    }
+
+
+# ----------------------------------------------------------------------------#
+# Venues.
+# ----------------------------------------------------------------------------#
+def venue_areas(genre=None, state=None, stream=False):
+    """Venues grouped by city/state with their upcoming show counts.
+
+    One round trip over Venue alone: the counts are the maintained counter
+    columns, and the rows come back ordered so consecutive rows of the same
+    area are adjacent. With ``stream`` the areas, and the venues in each, are
+    generators over a server-side cursor and must be iterated in order.
+    """
+    query = (
+        select(
+            Venue.city,
+            Venue.state,
+            Venue.id,
+            Venue.name,
+            Venue.upcoming_shows_count.label("num_upcoming_shows"),
+        )
+        .where(*facet_filters(Venue, genre, state))
+        .order_by(Venue.state, Venue.city, Venue.name)
+    )
+    areas = _group_areas(fetch(query, stream))
+    if stream:
+        return areas
+    return [{**area, "venues": list(area["venues"])} for area in areas]
+
+
+def _group_areas(rows):
+    for (city, state), venues in groupby(rows, key=lambda row: (row.city, row.state)):
+        yield {
+            "city": city,
+            "state": state,
+            "venues": (
+                {"id": row.id, "name": row.name, "num_upcoming_shows": row.num_upcoming_shows}
+                for row in venues
+            ),
+        }
+
+
+# ----------------------------------------------------------------------------#
+# Artists.
+# ----------------------------------------------------------------------------#
+def artist_list(genre=None, state=None, stream=False):
+    return fetch(select(Artist.id, Artist.name).where(*facet_filters(Artist, genre, state)), stream)
+
+
+# ----------------------------------------------------------------------------#
+# Show timelines.
+# ----------------------------------------------------------------------------#
+def _show_timeline_query(owner_column, owner_id, joined, columns, limit=None):
+    """Split the shows of one venue or artist into upcoming and past in SQL.
+
+    Upcoming shows come back soonest first and past shows most recent first;
+    both lists are capped at ``limit`` while the counts cover every show.
+    """
+    is_upcoming = Show.start_time > datetime.now()
+    ranked = (
+        select(
+            *columns,
+            Show.start_time,
+            is_upcoming.label("upcoming"),
+            func.row_number()
+            .over(
+                partition_by=is_upcoming,
+                order_by=(case((is_upcoming, Show.start_time)), Show.start_time.desc()),
+            )
+            .label("position"),
+            func.count().over(partition_by=is_upcoming).label("total"),
+        )
+        .join(joined)
+        .where(owner_column == owner_id)
+        .subquery()
+    )
+    query = select(
+        *(ranked.c[column.key] for column in (*columns, Show.start_time)),
+        ranked.c.upcoming,
+        ranked.c.total,
+    ).order_by(ranked.c.position)
+    if limit:
+        query = query.where(ranked.c.position <= limit)
+    return query
+
+
+def show_timeline(rows):
+    """The upcoming/past lists and counts the detail templates expect."""
+    timeline = {
+        "upcoming_shows": [],
+        "upcoming_shows_count": 0,
+        "past_shows": [],
+        "past_shows_count": 0,
+    }
+    for row in rows:
+        show = dict(row._mapping)
+        key = "upcoming_shows" if show.pop("upcoming") else "past_shows"
+        timeline[key + "_count"] = show.pop("total")
+        timeline[key].append(show)
+    return timeline
+
+
+def venue_shows_query(venue_id, limit=None):
+    return _show_timeline_query(
+        Show.venue_id,
+        venue_id,
+        Artist,
+        (
+            Show.artist_id,
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+        ),
+        limit,
+    )
+
+
+def artist_shows_query(artist_id, limit=None):
+    return _show_timeline_query(
+        Show.artist_id,
+        artist_id,
+        Venue,
+        (
+            Show.venue_id,
+            Venue.name.label("venue_name"),
+            Venue.image_link.label("venue_image_link"),
+        ),
+        limit,
+    )
+
+
+def venue_shows(venue_id, limit=None):
+    return show_timeline(db.session.execute(venue_shows_query(venue_id, limit)))
+
+
+def artist_shows(artist_id, limit=None):
+    return show_timeline(db.session.execute(artist_shows_query(artist_id, limit)))
+
+
+# ----------------------------------------------------------------------------#
+# Calendars and bookings.
+#
+# No two shows of a venue, or of an artist, overlap (see models.py), so
+# ordered by start time their end times are ordered too. The only show that
+# starts before a range and can still reach into it is the latest one, and
+# one index seek on (owner, start_time) finds it.
+# ----------------------------------------------------------------------------#
+def _latest_before(owner_column, owner_id, moment, *columns):
+    return (
+        select(*columns)
+        .where(owner_column == owner_id, Show.start_time < moment)
+        .order_by(Show.start_time.desc())
+        .limit(1)
+    )
+
+
+def calendar(owner_column, owner_id, start, end):
+    """Shows of one venue or artist that overlap [start, end), in order.
+
+    One index range scan from the show in progress at ``start`` (if any) to
+    ``end``, however many shows the owner has outside the range.
+    """
+    first = _latest_before(owner_column, owner_id, start, Show.start_time).scalar_subquery()
+    query = (
+        select(
+            Show.id,
+            Show.start_time,
+            Show.end_time,
+            Show.venue_id,
+            Venue.name.label("venue_name"),
+            Show.artist_id,
+            Artist.name.label("artist_name"),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+        .where(
+            owner_column == owner_id,
+            Show.start_time >= func.coalesce(first, start),
+            Show.start_time < end,
+            Show.end_time > start,
+        )
+        .order_by(Show.start_time)
+    )
+    return [dict(row) for row in db.session.execute(query).mappings()]
+
+
+def booking_conflicts(venue_id, artist_id, start, end):
+    """The shows that a new show at ``venue_id`` with ``artist_id`` would overlap.
+
+    Returns {"venue": show_id or None, "artist": show_id or None}, at one
+    index seek each. The database constraints are what enforce bookings;
+    this check is what lets the form say which one is taken.
+    """
+    conflicts = {}
+    for name, owner_column, owner_id in (
+        ("venue", Show.venue_id, venue_id),
+        ("artist", Show.artist_id, artist_id),
+    ):
+        latest = db.session.execute(
+            _latest_before(owner_column, owner_id, end, Show.id, Show.end_time)
+        ).first()
+        conflicts[name] = latest.id if latest is not None and latest.end_time > start else None
+    return conflicts
+
+
+def booked_shows(venue_ids, artist_ids, start, end):
+    """The shows of ``venue_ids`` and ``artist_ids`` that can overlap [start, end).
+
+    Those that start in the range and, per venue and artist, the latest one
+    before it, in one round trip: what checking a batch of new shows against
+    the bookings needs, sorted and compared in memory as booking_conflicts
+    would one by one.
+    """
+    columns = (Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time)
+    parts = []
+    for owner_column, ids in ((Show.venue_id, venue_ids), (Show.artist_id, artist_ids)):
+        ids = sorted(set(ids))
+        latest = (
+            select(owner_column, func.max(Show.start_time))
+            .where(owner_column.in_(ids), Show.start_time < start)
+            .group_by(owner_column)
+        )
+        parts += [
+            select(*columns).where(
+                owner_column.in_(ids), Show.start_time >= start, Show.start_time < end
+            ),
+            select(*columns).where(tuple_(owner_column, Show.start_time).in_(latest)),
+        ]
+    return db.session.execute(union_all(*parts)).all()
+
+
+# ----------------------------------------------------------------------------#
+# Show listing.
+# ----------------------------------------------------------------------------#
+def encode_cursor(start_time, show_id):
+    return f"{start_time.isoformat()}_{show_id}"
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    start_time, _, show_id = cursor.rpartition("_")
+    return datetime.fromisoformat(start_time), int(show_id)
+
+
+class ShowPage:
+    """The rows of one /shows page and the cursor of the next one.
+
+    The query asks for one row more than ``limit``; that row only tells
+    whether there is a next page. ``next_cursor`` is set once iteration has
+    gone past the last row, so a template reads it after its loop.
+    """
+
+    def __init__(self, rows, limit):
+        self._rows = rows
+        self.limit = limit
+        self.next_cursor = None
+
+    def __iter__(self):
+        last = None
+        for position, row in enumerate(self._rows):
+            if position == self.limit:
+                self.next_cursor = encode_cursor(last.start_time, last.id)
+                break
+            last = row
+            yield dict(row._mapping)
+
+
+def shows_page(after=None, limit=50, stream=False):
+    """One page of shows ordered by (start_time, id), starting after ``after``.
+
+    Keyset pagination: the cursor is the sort key of the last row already
+    seen, so every page is an index range scan no matter how deep it is.
+    Raises ValueError on a malformed cursor, before any row is read.
+    """
+    query = (
+        select(
+            Show.id,
+            Show.start_time,
+            Show.venue_id,
+            Venue.name.label("venue_name"),
+            Show.artist_id,
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+        .order_by(Show.start_time, Show.id)
+        .limit(limit + 1)
+    )
+    if after is not None:
+        query = query.where(tuple_(Show.start_time, Show.id) > tuple_(*decode_cursor(after)))
+    return ShowPage(fetch(query, stream), limit)
+
+
+# ----------------------------------------------------------------------------#
+# Page versions.
+#
+# Each returns (last_modified, token) for everything a page renders in one
+# small query, so a conditional GET is cheap. Detail pages aggregate the
+# updated_at of their row and its shows; counts are part of the token so
+# deletes and shows moving from upcoming to past change the ETag too (the
+# show counters live on Venue/Artist, whose updated_at their updates bump).
+# List pages read the per-table versions kept by versions.py instead of
+# aggregating whole tables.
+# ----------------------------------------------------------------------------#
+def _latest(*timestamps):
+    return max(timestamp for timestamp in timestamps if timestamp is not None)
+
+
+def _detail_version(model, owner_column, other_model, other_column, owner_id):
+    row = db.session.execute(
+        select(
+            model.updated_at,
+            func.max(Show.updated_at),
+            func.max(other_model.updated_at),
+            func.count(Show.id),
+            func.count(Show.id).filter(Show.start_time > datetime.now()),
+        )
+        .outerjoin(Show, owner_column == model.id)
+        .outerjoin(other_model, other_column == other_model.id)
+        .where(model.id == owner_id)
+        .group_by(model.id, model.updated_at)
+    ).first()
+    if row is None:
+        return None
+    return _latest(*row[:3]), tuple(row)
+
+
+def venue_version(venue_id):
+    return _detail_version(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+
+def artist_version(artist_id):
+    return _detail_version(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+
+def _table_version(*names):
+    rows = db.session.execute(
+        select(TableVersion.updated_at, TableVersion.version)
+        .where(TableVersion.name.in_(names))
+        .order_by(TableVersion.name)
+    ).all()
+    if not rows:
+        return datetime(1970, 1, 1), ()
+    return _latest(*(row.updated_at for row in rows)), tuple(row.version for row in rows)
+
+
+def venues_version():
+    return _table_version("Venue")
+
+
+def artists_version():
+    return _table_version("Artist")
+
+
+def shows_version():
+    return _table_version("Show", "Venue", "Artist")
@@ -0,0 +1,113 @@
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc, text
+
+
+def read_only(view):
+    """Mark a view as safe to serve from the read replica."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+
+    wrapper.read_only = True
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Sends reads made by read-only views to the replica bind when it is up."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get("db_use_replica"):
+            engine = current_app.extensions["replica_router"].replica_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Read-replica routing for the ``replica`` entry of SQLALCHEMY_BINDS.
+
+    A request reads from the replica when its view is marked ``read_only``,
+    the replica passed its last health check, and the client has not written
+    anything in the last REPLICA_PIN_SECONDS. That pin lives in the session
+    cookie, so the page a write redirects to reads its own write from the
+    primary. Health is checked at most every REPLICA_HEALTH_INTERVAL seconds;
+    a disconnect error on the replica also marks it down until the next check.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.db = None
+        self._healthy = False
+        self._next_check = 0.0
+        self._watched = set()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.db = db
+        app.config.setdefault("REPLICA_PIN_SECONDS", 10)
+        app.config.setdefault("REPLICA_HEALTH_INTERVAL", 5)
+        app.extensions["replica_router"] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if not event.contains(RoutingSession, "after_flush", self._on_write):
+            event.listen(RoutingSession, "after_flush", self._on_write)
+            event.listen(RoutingSession, "do_orm_execute", self._on_execute)
+
+    # Request hooks.
+    def _before_request(self):
+        view = current_app.view_functions.get(request.endpoint)
+        g.db_use_replica = (
+            getattr(view, "read_only", False)
+            and "replica" in current_app.config.get("SQLALCHEMY_BINDS", {})
+            and session.get("_primary_until", 0) < time.time()
+        )
+
+    def _after_request(self, response):
+        if g.get("db_wrote"):
+            session["_primary_until"] = time.time() + current_app.config["REPLICA_PIN_SECONDS"]
+        return response
+
+    def _on_write(self, db_session, flush_context):
+        if has_request_context():
+            g.db_wrote = True
+
+    def _on_execute(self, orm_execute_state):
+        if has_request_context() and (
+            orm_execute_state.is_insert
+            or orm_execute_state.is_update
+            or orm_execute_state.is_delete
+        ):
+            g.db_wrote = True
+
+    # Health.
+    def replica_engine(self):
+        engine = self.db.engines.get("replica")
+        if engine is None:
+            return None
+        if engine not in self._watched:
+            event.listen(engine, "handle_error", self._on_error)
+            self._watched.add(engine)
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._healthy = self._ping(engine)
+            self._next_check = now + current_app.config["REPLICA_HEALTH_INTERVAL"]
+        return engine if self._healthy else None
+
+    def _ping(self, engine):
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except exc.SQLAlchemyError as e:
+            current_app.logger.warning("Read replica unavailable, using primary: %s", e)
+            return False
+        return True
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            self._healthy = False
+            self._next_check = time.monotonic() + current_app.config["REPLICA_HEALTH_INTERVAL"]
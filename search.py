@@ -0,0 +1,78 @@
+import re
+
+from sqlalchemy import String, and_, case, cast, func, or_, select
+
+from extensions import db
+
+
+# ----------------------------------------------------------------------------#
+# Venue and artist search.
+#
+# On Postgres every predicate is backed by a GIN index created in migration
+# 3c9f6e2b7a41: pg_trgm on name for partial matches, and a full-text document
+# over name, city, state and genres for multi-word terms such as
+# "San Francisco, CA" or "jazz". Other databases (SQLite for local runs) fall
+# back to case-insensitive LIKE over the same fields.
+# ----------------------------------------------------------------------------#
+def _like_pattern(term):
+    escaped = term.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escaped}%"
+
+
+def _postgres_match(model, term):
+    document = func.fyyur_search_document(model.name, model.city, model.state, model.genres)
+    query = func.plainto_tsquery("simple", term)
+    name_match = model.name.ilike(_like_pattern(term), escape="/")
+    matches = name_match | document.op("@@")(query)
+    rank = func.ts_rank(document, query) + func.similarity(model.name, term)
+    return matches, rank
+
+
+def _fallback_match(model, term):
+    # Like plainto_tsquery, every word of the term has to match some field.
+    fields = (model.name, model.city, model.state, cast(model.genres, String))
+    words = [
+        or_(*(field.ilike(_like_pattern(word), escape="/") for field in fields))
+        for word in re.findall(r"[\w&-]+", term)
+    ]
+    name_match = model.name.ilike(_like_pattern(term), escape="/")
+    rank = case((func.lower(model.name) == term.lower(), 3), (name_match, 2), else_=1)
+    return or_(name_match, and_(*words)) if words else name_match, rank
+
+
+def search(model, term, page=1, per_page=20):
+    """Relevance-ranked page of ``model`` rows matching ``term``.
+
+    Returns the shape the search templates expect: the total number of
+    matches and one page of id/name/num_upcoming_shows dicts. The total comes
+    back in the same query as the rows; the counts are the counter columns.
+    """
+    term = term.strip()
+    if db.session.get_bind().dialect.name == "postgresql":
+        matches, rank = _postgres_match(model, term)
+    else:
+        matches, rank = _fallback_match(model, term)
+
+    query = select(
+        model.id,
+        model.name,
+        model.upcoming_shows_count.label("num_upcoming_shows"),
+        func.count().over().label("total"),
+    )
+    if term:
+        query = query.where(matches).order_by(rank.desc(), model.name, model.id)
+    else:
+        query = query.order_by(model.name, model.id)
+    query = query.limit(per_page).offset((page - 1) * per_page)
+
+    rows = db.session.execute(query).mappings().all()
+    count = rows[0]["total"] if rows else 0
+    return {
+        "count": count,
+        "data": [
+            {"id": row.id, "name": row.name, "num_upcoming_shows": row.num_upcoming_shows}
+            for row in rows
+        ],
+        "page": page,
+        "pages": (count + per_page - 1) // per_page,
+    }
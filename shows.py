@@ -0,0 +1,82 @@
+from flask import Blueprint, abort, current_app, flash, render_template, request, stream_template
+from sqlalchemy.exc import IntegrityError
+
+from conditional import conditional
+from extensions import cache, db
+from forms import ShowForm
+from invalidation import invalidate_show
+from models import DEFAULT_SHOW_DURATION, Show
+from queries import booking_conflicts, shows_page, shows_version
+from routing import read_only
+
+bp = Blueprint("shows", __name__)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+
+@bp.route("/shows")
+@read_only
+@conditional(shows_version)
+@cache.cached(lambda: "shows:" + request.query_string.decode())
+def shows():
+    limit = request.args.get("limit", current_app.config["SHOWS_PAGE_SIZE"], type=int)
+    limit = max(1, min(limit, current_app.config["SHOWS_PAGE_SIZE_MAX"]))
+    stream = current_app.config["STREAM_LIST_PAGES"]
+    try:
+        page = shows_page(after=request.args.get("after"), limit=limit, stream=stream)
+    except ValueError:
+        abort(400)
+    render = stream_template if stream else render_template
+    return render("pages/shows.html", shows=page, limit=limit)
+
+
+@bp.route("/shows/create")
+def create_shows():
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template("forms/new_show.html", form=form)
+
+
+@bp.route("/shows/create", methods=["POST"])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+    form = ShowForm(request.form)
+    if not form.validate():
+        for field, errors in form.errors.items():
+            for error in errors:
+                flash(field + " - " + str(error), "danger")
+        return render_template("pages/home.html")
+
+    start_time = form.start_time.data
+    end_time = form.end_time.data or start_time + DEFAULT_SHOW_DURATION
+    conflicts = booking_conflicts(form.venue_id.data, form.artist_id.data, start_time, end_time)
+    for name, show_id in conflicts.items():
+        if show_id is not None:
+            flash(f"The {name} is already booked then, for show {show_id}.", "danger")
+    if any(conflicts.values()):
+        return render_template("pages/home.html")
+
+    show = Show(
+        artist_id=form.artist_id.data,
+        venue_id=form.venue_id.data,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    db.session.add(show)
+    try:
+        db.session.commit()
+        invalidate_show(show.venue_id, show.artist_id)
+        flash("Show was successfully listed!")
+    except IntegrityError as e:
+        db.session.rollback()
+        # Another request booked the same slot since the check above.
+        if "_booking" in str(e.orig):
+            flash("The venue or artist was booked for that time in the meantime.", "danger")
+        else:
+            flash("An error occurred. Show could not be listed.")
+    except Exception as e:
+        db.session.rollback()
+        flash("An error occurred. Show could not be listed.")
+    return render_template("pages/home.html")
@@ -2,3 +2,26 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Search-as-you-type: fills the search box's datalist from /api/autocomplete.
+document.querySelectorAll('input[data-autocomplete]').forEach(function (input) {
+  var list = document.getElementById(input.getAttribute('list'));
+  var pending = null;
+  input.addEventListener('input', function () {
+    var query = input.value.trim();
+    if (pending) pending.abort();
+    if (!query) return;
+    pending = new AbortController();
+    fetch('/api/autocomplete?type=' + input.dataset.autocomplete +
+          '&q=' + encodeURIComponent(query), {signal: pending.signal})
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        list.replaceChildren.apply(list, data.results.map(function (result) {
+          var option = document.createElement('option');
+          option.value = result.name;
+          return option;
+        }));
+      })
+      .catch(function () {});
+  });
+});
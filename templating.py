@@ -0,0 +1,125 @@
+"""Template compilation ahead of the first request.
+
+Jinja compiles a template to Python the first time it is rendered in a
+process, which every new worker pays on its first hit of each page. With
+TEMPLATE_CACHE_DIR set, the compiled bytecode is kept in that directory and
+shared by every worker on the host and across restarts; ``flask templates
+precompile`` fills it at deploy time. With TEMPLATE_WARMUP on, create_app
+also renders each page once against the fixture data below, so the first
+real request finds the templates loaded and what they load lazily (the
+Babel locale data behind the datetime filter, the forms) already in memory.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, render_template
+from flask.cli import AppGroup, with_appcontext
+from jinja2 import FileSystemBytecodeCache
+
+templates_cli = AppGroup("templates", help="Compile the Jinja templates ahead of time.")
+
+
+def configure_templates(app):
+    directory = app.config.get("TEMPLATE_CACHE_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def compile_templates(app):
+    """Load every template, filling the bytecode cache; returns their names."""
+    names = app.jinja_env.list_templates(extensions=["html"])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
+
+
+@templates_cli.command("precompile")
+@with_appcontext
+def precompile_command():
+    """Compile every template into TEMPLATE_CACHE_DIR."""
+    if not current_app.config.get("TEMPLATE_CACHE_DIR"):
+        raise click.ClickException("TEMPLATE_CACHE_DIR is not set; there is nowhere to keep them.")
+    started = time.perf_counter()
+    names = compile_templates(current_app)
+    elapsed = (time.perf_counter() - started) * 1000
+    click.echo(
+        f"Compiled {len(names)} templates into {current_app.config['TEMPLATE_CACHE_DIR']} "
+        f"in {elapsed:.0f}ms."
+    )
+
+
+# ----------------------------------------------------------------------------#
+# Warmup.
+# ----------------------------------------------------------------------------#
+def _shows(other):
+    start_time = datetime.now().replace(microsecond=0) + timedelta(days=7)
+    return [
+        {
+            f"{other}_id": 1,
+            f"{other}_name": "Warmup",
+            f"{other}_image_link": "",
+            "start_time": start_time,
+        }
+    ]
+
+
+def _owner(other, **fields):
+    return {
+        "id": 1,
+        "name": "Warmup",
+        "city": "San Francisco",
+        "state": "CA",
+        "genres": ["Jazz"],
+        "upcoming_shows": _shows(other),
+        "upcoming_shows_count": 2,
+        "past_shows": _shows(other),
+        "past_shows_count": 1,
+        **fields,
+    }
+
+
+def _pages():
+    # Imported here: the forms pull in WTForms, which startup does not need.
+    from forms import ArtistForm, EditArtistForm, EditVenueForm, ShowForm, VenueForm
+
+    facets = {"genres": [("Jazz", 1)], "states": [("CA", 1)]}
+    lists = {"facets": facets, "genre": "Jazz", "state": None}
+    results = {"count": 1, "data": [{"id": 1, "name": "Warmup"}], "page": 1, "pages": 2}
+    venue = _owner("artist", seeking_talent=True, seeking_description="Warmup")
+    artist = _owner("venue", seeking_venue=False)
+    shows = [{**_shows("venue")[0], **_shows("artist")[0]}]
+    return {
+        "pages/home.html": {},
+        "pages/venues.html": {
+            "areas": [{"city": "San Francisco", "state": "CA", "venues": [venue]}],
+            **lists,
+        },
+        "pages/artists.html": {"artists": [artist], **lists},
+        "pages/show_venue.html": {"venue": venue},
+        "pages/show_artist.html": {"artist": artist},
+        "pages/search_venues.html": {"results": results, "search_term": "warmup"},
+        "pages/search_artists.html": {"results": results, "search_term": "warmup"},
+        "pages/shows.html": {"shows": shows, "limit": 1},
+        "forms/new_venue.html": {"form": VenueForm()},
+        "forms/edit_venue.html": {"form": EditVenueForm(), "venue": venue},
+        "forms/new_artist.html": {"form": ArtistForm()},
+        "forms/edit_artist.html": {"form": EditArtistForm(), "artist": artist},
+        "forms/new_show.html": {"form": ShowForm()},
+        "errors/404.html": {},
+        "errors/500.html": {},
+    }
+
+
+def warm_templates(app):
+    """Render each page once against fixture data; no database involved."""
+    started = time.perf_counter()
+    with app.test_request_context():
+        pages = _pages()
+        for name, context in pages.items():
+            render_template(name, **context)
+    app.logger.info(
+        "Warmed up %d templates in %.0fms", len(pages), (time.perf_counter() - started) * 1000
+    )
@@ -0,0 +1,239 @@
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_template,
+    url_for,
+)
+from sqlalchemy.orm.exc import StaleDataError
+
+from conditional import conditional
+from editing import load_for_edit, save_edit
+from extensions import async_reads, autocomplete, cache, db
+from forms import EditVenueForm, VenueForm, calendar_range, list_filters
+from invalidation import invalidate_venue, invalidate_venue_lists, show_artist_ids
+from models import Venue, Show
+from queries import (
+    calendar,
+    facet_counts,
+    show_timeline,
+    venue_areas,
+    venue_shows,
+    venue_shows_query,
+    venue_version,
+    venues_version,
+)
+from routing import read_only
+from search import search
+
+bp = Blueprint("venues", __name__)
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+
+@bp.route("/venues")
+@read_only
+@conditional(venues_version)
+@cache.cached(lambda: "venues:{}:{}".format(*list_filters(request.args)))
+def venues():
+    genre, state = list_filters(request.args)
+    facets = cache.get_or_set(
+        f"facets:venues:{genre or ''}:{state or ''}",
+        lambda: facet_counts(Venue, genre, state),
+    )
+    stream = current_app.config["STREAM_LIST_PAGES"]
+    render = stream_template if stream else render_template
+    return render(
+        "pages/venues.html",
+        areas=venue_areas(genre, state, stream=stream),
+        facets=facets,
+        genre=genre,
+        state=state,
+    )
+
+
+@bp.route("/venues/search", methods=["POST"])
+@read_only
+def search_venues():
+    search_term = request.form.get("search_term", "")
+    page = max(1, request.form.get("page", 1, type=int))
+    response = search(Venue, search_term, page, current_app.config["SEARCH_PAGE_SIZE"])
+    return render_template(
+        "pages/search_venues.html",
+        results=response,
+        search_term=search_term,
+    )
+
+
+@bp.route("/venues/<int:venue_id>")
+@read_only
+@conditional(venue_version)
+@cache.cached(lambda venue_id: f"venue:{venue_id}")
+def show_venue(venue_id):
+    limit = current_app.config["DETAIL_SHOWS_LIMIT"]
+    if async_reads.enabled:
+        rows, shows = async_reads.gather(
+            db.select(Venue.__table__).where(Venue.id == venue_id),
+            venue_shows_query(venue_id, limit),
+        )
+        if not rows:
+            abort(404)
+        venue, shows = rows[0], show_timeline(shows)
+    else:
+        venue = Venue.query.get_or_404(venue_id)
+        shows = venue_shows(venue_id, limit=limit)
+    data = {
+        "id": venue.id,
+        "name": venue.name,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website_link": venue.website_link,
+        "address": venue.address,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "genres": venue.genres,
+        **shows,
+    }
+    return render_template("pages/show_venue.html", venue=data)
+
+
+@bp.route("/venues/<int:venue_id>/calendar")
+@read_only
+def venue_calendar(venue_id):
+    db.get_or_404(Venue, venue_id)
+    start, end = calendar_range(
+        request.args,
+        current_app.config["CALENDAR_DEFAULT_DAYS"],
+        current_app.config["CALENDAR_MAX_DAYS"],
+    )
+    shows = calendar(Show.venue_id, venue_id, start, end)
+    for show in shows:
+        show["start_time"] = show["start_time"].isoformat()
+        show["end_time"] = show["end_time"].isoformat()
+    return jsonify(venue_id=venue_id, start=start.isoformat(), end=end.isoformat(), shows=shows)
+
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route("/venues/create", methods=["GET"])
+def create_venue_form():
+    form = VenueForm()
+    return render_template("forms/new_venue.html", form=form)
+
+
+@bp.route("/venues/create", methods=["POST"])
+def create_venue_submission():
+    # TODO: insert form data as a new Venue record in the db, instead
+    form = VenueForm(request.form)
+    if form.validate():
+        try:
+            venue = Venue(
+                name=form.name.data,
+                city=form.city.data,
+                state=form.state.data,
+                address=form.address.data,
+                phone=form.phone.data,
+                image_link=form.image_link.data,
+                genres=form.genres.data,
+                facebook_link=form.facebook_link.data,
+                website_link=form.website_link.data,
+                seeking_talent=form.seeking_talent.data,
+                seeking_description=form.seeking_description.data,
+            )
+            db.session.add(venue)
+            db.session.commit()
+            invalidate_venue_lists()
+            autocomplete.put("venue", venue.id, venue.name)
+            # on successful db insert, flash success
+            flash("Venue " + request.form["name"] + " was successfully listed!")
+        except:
+            db.session.rollback()
+            flash("An error occurred. Venue " + request.form["name"] + " could not be listed.")
+        finally:
+            db.session.close()
+    else:
+        for field, errors in form.errors.items():
+            for error in errors:
+                flash(field + " - " + str(error), "danger")
+    return render_template("pages/home.html")
+
+
+@bp.route("/venues/<venue_id>", methods=["DELETE"])
+def delete_venue(venue_id):
+    # TODO: Complete this endpoint for taking a venue_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    venue = Venue.query.get_or_404(venue_id)
+    del_venue = venue.name
+    artist_ids = show_artist_ids(venue.id)
+    try:
+        db.session.delete(venue)
+        db.session.commit()
+        invalidate_venue(venue_id, artist_ids)
+        autocomplete.remove("venue", int(venue_id))
+        flash("Venue" + del_venue + " was deleted!")
+    except Exception as e:
+        db.session.rollback()
+        flash("An error occurred. Venue " + del_venue + "could not be deleted!")
+    return render_template("pages/home.html")
+
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@bp.route("/venues/<int:venue_id>/edit", methods=["GET"])
+def edit_venue(venue_id):
+    form = EditVenueForm()
+    venue = load_for_edit(Venue, venue_id, form)
+    form.process(obj=venue)
+    return render_template("forms/edit_venue.html", form=form, venue=venue)
+
+
+@bp.route("/venues/<int:venue_id>/edit", methods=["POST"])
+def edit_venue_submission(venue_id):
+    form = EditVenueForm()
+    if not form.validate():
+        for field, errors in form.errors.items():
+            for error in errors:
+                flash(field + " - " + str(error), "danger")
+        return redirect(url_for("venues.show_venue", venue_id=venue_id))
+
+    venue = load_for_edit(Venue, venue_id, form)
+    try:
+        changed = save_edit(venue, form)
+    except StaleDataError:
+        db.session.rollback()
+        flash(
+            "Venue " + form.name.data + " was changed by someone else while you were editing it."
+            " Your changes were not saved; the form now shows the current details.",
+            "danger",
+        )
+        return redirect(url_for("venues.edit_venue", venue_id=venue_id))
+    except Exception as e:
+        db.session.rollback()
+        flash("An error occurred. Venue " + form.name.data + " could not be updated.")
+        return redirect(url_for("venues.show_venue", venue_id=venue_id))
+
+    if changed:
+        invalidate_venue(venue_id, show_artist_ids(venue_id))
+        if "name" in changed:
+            autocomplete.put("venue", venue_id, form.name.data)
+        flash("Venue " + form.name.data + " was successfully updated!")
+    else:
+        flash("Venue " + form.name.data + " was not changed.")
+    return redirect(url_for("venues.show_venue", venue_id=venue_id))
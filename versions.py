@@ -0,0 +1,39 @@
+"""Per-table versions behind the ETags of the list pages.
+
+TableVersion holds a counter and a timestamp for Venue, Artist and Show.
+The mapper events below bump the row of every table a flush writes to, on
+the flush's own connection, so the bump commits (or rolls back) with the
+write; a show also bumps Venue and Artist, whose counters it changes.
+Writes that bypass the ORM (``flask import``, ``flask counters``) call
+``bump_versions`` themselves. Reading the versions is then a primary-key
+lookup of a few rows, however large the tables grow.
+"""
+from datetime import datetime
+
+from sqlalchemy import event, update
+
+from models import Artist, Show, TableVersion, Venue
+
+
+def bump_versions(connection, *names):
+    connection.execute(
+        update(TableVersion)
+        .where(TableVersion.name.in_(names))
+        .values(version=TableVersion.version + 1, updated_at=datetime.utcnow())
+    )
+
+
+def _bump(*names):
+    def listener(mapper, connection, target):
+        bump_versions(connection, *names)
+
+    return listener
+
+
+for _model, _names in (
+    (Venue, ("Venue",)),
+    (Artist, ("Artist",)),
+    (Show, ("Show", "Venue", "Artist")),
+):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _bump(*_names))